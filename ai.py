@@ -0,0 +1,503 @@
+import time
+from collections import deque
+
+import numpy as np
+
+from grid import OBSTACLE
+
+DIRECTIONS = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+
+
+# --- Enhanced AI Function ---
+def get_direction_for_snake(world, snake):
+    foods, powerups, snakes = world.foods, world.powerups, world.snakes
+    first_food = next(iter(foods), None)       # the oldest one
+    head = snake.head()
+    candidate_moves = []
+
+    for move in DIRECTIONS:
+        # Avoid immediate reversal.
+        if len(snake.segments) > 1:
+            if (head[0] + move[0], head[1] + move[1]) == snake.segments[1]:
+                continue
+        new_head = (head[0] + move[0], head[1] + move[1])
+        if not world.in_bounds(new_head) or world.is_obstacle(new_head):
+            continue
+
+        enemy_collision = False
+        attack_bonus = 0
+        for other in snakes:
+            if other == snake:
+                continue
+            if new_head == other.head():
+                if snake.aggressive_timer > 0 or len(snake.segments) > len(other.segments):
+                    attack_bonus = 20
+                else:
+                    enemy_collision = True
+                    break
+            elif new_head in other.segments:
+                enemy_collision = True
+                break
+        if enemy_collision:
+            continue
+
+        # Compute cost to target: choose the closer of food vs. powerup (if no powerup active)
+        food_cost = min([abs(new_head[0]-f[0]) + abs(new_head[1]-f[1]) for f in foods]) if foods else 1000
+        if (snake.aggressive_timer == 0 and snake.shield_timer == 0 and snake.multiplier_timer == 0
+                and powerups):
+            pu_cost = min([abs(new_head[0]-pu[0]) + abs(new_head[1]-pu[1]) for pu in powerups])
+            target_cost = min(food_cost, pu_cost * 0.7)  # weight powerup distance lower
+        else:
+            target_cost = food_cost
+
+        # Bonus for blocking enemy paths.
+        for other in snakes:
+            if other == snake:
+                continue
+            if foods:
+                enemy_to_food = abs(other.head()[0]-first_food[0]) + abs(other.head()[1]-first_food[1])
+                if enemy_to_food < target_cost and \
+                        abs(new_head[0]-other.head()[0]) + abs(new_head[1]-other.head()[1]) == 1:
+                    target_cost -= 5
+        if new_head in snake.segments:
+            target_cost += 10
+        total_cost = target_cost - attack_bonus
+        candidate_moves.append((move, total_cost))
+
+    if candidate_moves:
+        candidate_moves.sort(key=lambda x: x[1])
+        return candidate_moves[0][0]
+    return None
+
+
+# --- Batched AI ---
+MOVES = np.array(DIRECTIONS, dtype=np.int64)
+NO_FOOD_COST = 1000
+ATTACK_BONUS = 20
+BLOCK_BONUS = 5
+SELF_PENALTY = 10
+
+
+class HeadIndex:
+    """Snake heads sorted by cell, for looking up who is on a given cell.
+
+    Cells are keyed with a margin of two around the board, so positions
+    just off the edge never alias a cell on the board.
+    """
+
+    def __init__(self, heads, height):
+        self.stride = height + 4
+        keys = self.keys(heads)
+        order = np.argsort(keys, kind='stable')
+        self.sorted = keys[order]
+        self.n = len(heads)
+        self.order = np.append(order, self.n)
+
+    def keys(self, cells):
+        return (cells[..., 0] + 2) * self.stride + cells[..., 1] + 2
+
+    def matches(self, cells):
+        # One index array per rank: the r-th snake (in snake order) whose head
+        # is on each cell, or n where there are fewer than r + 1 of them.
+        keys = self.keys(cells)
+        lo = np.searchsorted(self.sorted, keys, side='left')
+        count = np.searchsorted(self.sorted, keys, side='right') - lo
+        for r in range(int(count.max(initial=0))):
+            yield np.where(r < count, self.order[np.minimum(lo + r, self.n)], self.n)
+
+
+def nearest_distance(world, cells, cx, cy, points):
+    # Manhattan distance from each cell to the closest point. With many
+    # cells and points, a distance transform over the whole board (two
+    # passes of running minima per axis) is cheaper than all the pairs.
+    if cells[..., 0].size * len(points) <= world.width * world.height:
+        return np.abs(cells[..., None, :] - points).sum(-1).min(-1)
+    dist = np.full((world.width, world.height), world.width + world.height, dtype=np.int64)
+    dist[points[:, 0], points[:, 1]] = 0
+    for axis in (1, 0):
+        dist = np.moveaxis(dist, axis, -1)
+        idx = np.arange(dist.shape[-1])
+        forward = np.minimum.accumulate(dist - idx, axis=-1) + idx
+        backward = (np.minimum.accumulate((dist + idx)[..., ::-1], axis=-1) - idx[::-1])[..., ::-1]
+        dist = np.moveaxis(np.minimum(forward, backward), -1, axis)
+    # Moves off the board are rejected anyway; they read the clamped cell.
+    return dist[cx, cy]
+
+
+def plan_moves(world):
+    """Score every move of every snake in one vectorized pass.
+
+    Returns ``(costs, choices)`` where ``costs`` is a (snakes x 4) float
+    matrix in ``DIRECTIONS`` order (``inf`` for rejected moves) and
+    ``choices[i]`` is the move ``get_direction_for_snake`` would pick for
+    ``world.snakes[i]`` on the current state, or None. Rows of dead snakes
+    are computed like any other and should be ignored by the caller.
+    """
+    snakes = world.snakes
+    n = len(snakes)
+    if n == 0:
+        return np.zeros((0, 4)), []
+
+    heads = np.array([s.head() for s in snakes], dtype=np.int64)               # (S, 2)
+    lengths = np.array([len(s.segments) for s in snakes], dtype=np.int64)
+    aggressive = np.array([s.aggressive_timer > 0 for s in snakes])
+    buffed = np.array([s.aggressive_timer > 0 or s.shield_timer > 0 or s.multiplier_timer > 0
+                       for s in snakes])
+
+    new_heads = heads[:, None, :] + MOVES[None, :, :]                          # (S, 4, 2)
+    nx, ny = new_heads[..., 0], new_heads[..., 1]
+    valid = (nx >= 0) & (nx < world.width) & (ny >= 0) & (ny < world.height)
+    cx, cy = np.where(valid, nx, 0), np.where(valid, ny, 0)
+    valid &= world.grid.items[cx, cy] != OBSTACLE
+
+    # Avoid immediate reversal; own-body membership for the self penalty.
+    own = np.zeros((n, 4), dtype=bool)
+    for i, s in enumerate(snakes):
+        segs = s.segments
+        hx, hy = s.head()
+        for m, (dx, dy) in enumerate(DIRECTIONS):
+            cell = (hx + dx, hy + dy)
+            own[i, m] = cell in segs
+            if len(segs) > 1 and cell == segs[1]:
+                valid[i, m] = False
+
+    # Enemy heads and bodies. Bodies are duplicate-free between moves, so the
+    # segments of other snakes covering a cell are its grid count minus our own.
+    # Heads are looked up by cell rather than compared pairwise, so this
+    # stays linear in the number of snakes (a move never lands on its own head).
+    heads_at = HeadIndex(heads, world.height)
+    win_hits = np.zeros((n, 4), dtype=np.int64)
+    for j in heads_at.matches(new_heads):
+        hit = j < n
+        j = np.where(hit, j, 0)
+        win_hits += hit & (aggressive[:, None] | (lengths[:, None] > lengths[j]))
+    covered = world.grid.snake_count[cx, cy] - own
+    valid &= covered <= win_hits
+    attack = np.where(win_hits > 0, ATTACK_BONUS, 0)
+
+    # Cost to target: the closer of food vs. (weighted) powerup if unbuffed.
+    if world.foods:
+        foods = np.array(list(world.foods), dtype=np.int64)
+        food_cost = nearest_distance(world, new_heads, cx, cy, foods)
+    else:
+        food_cost = np.full((n, 4), NO_FOOD_COST, dtype=np.int64)
+    cost = food_cost.astype(np.float64)
+    if world.powerups:
+        pus = np.array(list(world.powerups), dtype=np.int64)
+        pu_cost = nearest_distance(world, new_heads, cx, cy, pus) * 0.7
+        cost = np.where(buffed[:, None], cost, np.minimum(cost, pu_cost))
+
+    # Blocking bonus, applied per adjacent enemy in snake order since each
+    # comparison sees the cost already lowered by the previous ones.
+    if world.foods:
+        enemy_to_food = np.append(np.abs(heads - foods[0]).sum(-1), 0)        # (S + 1,)
+        around = new_heads[:, :, None, :] + MOVES                              # (S, 4, 4, 2)
+        adjacent = list(heads_at.matches(around))
+        if adjacent:
+            adjacent = np.sort(np.concatenate(adjacent, axis=-1), axis=-1)     # (S, 4, K)
+            rows = np.arange(n)[:, None]
+            for k in np.moveaxis(adjacent, -1, 0):
+                hit = (k < n) & (k != rows) & (enemy_to_food[k] < cost)
+                cost = cost - BLOCK_BONUS * hit
+
+    cost = cost + SELF_PENALTY * own
+    cost = cost - attack
+    cost = np.where(valid, cost, np.inf)
+
+    best = cost.argmin(-1)
+    choices = [DIRECTIONS[best[i]] if valid[i].any() else None for i in range(n)]
+    return cost, choices
+
+
+# --- Lookahead AI ---
+LOOKAHEAD_DEPTH = 8          # BFS radius searched around each candidate move
+LOOKAHEAD_BUDGET_US = 1000   # Search time per snake and tick (None: always full depth)
+TRAP_PENALTY = 100           # Scaled by how much of the snake would not fit
+THREAT_PENALTY = 30          # Next to the head of an enemy that wins a head-on
+POWERUP_WEIGHT = 0.7         # Powerups count as this much closer, as above
+UNREACHABLE = 1 << 30
+
+
+def neighbor_lists(width, height):
+    # Flat cell index is x * height + y, matching the grid arrays' ravel().
+    neighbors = []
+    for x in range(width):
+        for y in range(height):
+            cells = []
+            for dx, dy in DIRECTIONS:
+                nx, ny = x + dx, y + dy
+                if 0 <= nx < width and 0 <= ny < height:
+                    cells.append(nx * height + ny)
+            neighbors.append(cells)
+    return neighbors
+
+
+class DistanceField:
+    """BFS distance from every cell to the nearest source cell.
+
+    Obstacles block; snakes do not (they move every tick and are left to the
+    per-snake search). The field is kept current incrementally: a new source
+    or a removed obstacle can only shorten distances and is relaxed outward
+    from its cell, while a removed source or a new obstacle resets just the
+    cells that had a shortest path through it and refills them from the
+    cells around them.
+    """
+
+    def __init__(self, neighbors):
+        self.neighbors = neighbors
+        self.blocked = [False] * len(neighbors)
+        self.sources = set()
+        self.dist = [UNREACHABLE] * len(neighbors)
+
+    def copy(self):
+        field = DistanceField(self.neighbors)
+        field.blocked = self.blocked.copy()
+        field.sources = self.sources.copy()
+        field.dist = self.dist.copy()
+        return field
+
+    def rebuild(self):
+        self.dist = [UNREACHABLE] * len(self.neighbors)
+        seeds = [cell for cell in self.sources if not self.blocked[cell]]
+        for cell in seeds:
+            self.dist[cell] = 0
+        self.spread(seeds)
+
+    def spread(self, seeds):
+        # Relax outward from seeds given in nondecreasing distance order;
+        # merging them with the BFS queue keeps every pop in order.
+        dist, blocked, neighbors = self.dist, self.blocked, self.neighbors
+        seeds, queue = deque(seeds), deque()
+        while seeds or queue:
+            if not queue or (seeds and dist[seeds[0]] <= dist[queue[0]]):
+                cell = seeds.popleft()
+            else:
+                cell = queue.popleft()
+            d = dist[cell] + 1
+            for nb in neighbors[cell]:
+                if d < dist[nb] and not blocked[nb]:
+                    dist[nb] = d
+                    queue.append(nb)
+
+    def invalidate(self, cell):
+        # Cells with a shortest path through cell are those reached from it
+        # by steps that each add exactly one to the distance.
+        dist, neighbors = self.dist, self.neighbors
+        region, inside = [cell], {cell}
+        for c in region:
+            d = dist[c] + 1
+            for nb in neighbors[c]:
+                if nb not in inside and dist[nb] == d:
+                    inside.add(nb)
+                    region.append(nb)
+        for c in region:
+            dist[c] = UNREACHABLE
+        seeds = set()
+        if cell in self.sources and not self.blocked[cell]:
+            dist[cell] = 0
+            seeds.add(cell)
+        for c in region:
+            for nb in neighbors[c]:
+                if nb not in inside and dist[nb] < UNREACHABLE:
+                    seeds.add(nb)
+        self.spread(sorted(seeds, key=dist.__getitem__))
+
+    def add_source(self, cell):
+        self.sources.add(cell)
+        if not self.blocked[cell] and self.dist[cell] > 0:
+            self.dist[cell] = 0
+            self.spread([cell])
+
+    def remove_source(self, cell):
+        self.sources.discard(cell)
+        if self.dist[cell] == 0:
+            self.invalidate(cell)
+
+    def add_obstacle(self, cell):
+        self.blocked[cell] = True
+        if self.dist[cell] < UNREACHABLE:
+            self.invalidate(cell)
+
+    def remove_obstacle(self, cell):
+        self.blocked[cell] = False
+        d = 0 if cell in self.sources else min(self.dist[nb] for nb in self.neighbors[cell]) + 1
+        if d < self.dist[cell]:
+            self.dist[cell] = d
+            self.spread([cell])
+
+
+class LookaheadAI:
+    """Move choice from shared distance fields plus a short per-snake search.
+
+    One DistanceField to the foods and one to the powerups are shared by all
+    snakes and follow the world's item events. Each candidate move (filtered
+    by the same safety rules as the greedy AI) gets a BFS through cells free
+    of snakes and obstacles: up to ``depth`` steps it finds the cheapest
+    "steps so far + field distance", and it keeps going until it has seen as
+    many cells as the snake is long, so moves into pockets too small to
+    hold the snake are penalized. A search stops once its move's share of
+    ``budget_us`` is spent; such a move is only taken when no other move
+    was searched in full.
+    """
+
+    def __init__(self, world, depth=LOOKAHEAD_DEPTH, budget_us=LOOKAHEAD_BUDGET_US):
+        self.world = world
+        self.depth = depth
+        self.budget = None if budget_us is None else budget_us / 1e6
+        self.height = world.height
+        self.neighbors = neighbor_lists(world.width, world.height)
+        self.food_field = DistanceField(self.neighbors)
+        self.powerup_field = DistanceField(self.neighbors)
+        self.rebuild()
+        world.subscribe(self.on_world_event)
+
+    def cell(self, pos):
+        return pos[0] * self.height + pos[1]
+
+    def rebuild(self):
+        # Full recompute from the world, e.g. after World.load_state.
+        world = self.world
+        obstacles = [self.cell(pos) for pos in world.obstacles]
+        for field in (self.food_field, self.powerup_field):
+            field.blocked = [False] * len(self.neighbors)
+            for cell in obstacles:
+                field.blocked[cell] = True
+        self.food_field.sources = {self.cell(pos) for pos in world.foods}
+        self.powerup_field.sources = {self.cell(pos) for pos in world.powerups}
+        self.food_field.rebuild()
+        self.powerup_field.rebuild()
+
+    def fork(self, world):
+        # Same fields, following another world (see World.fork).
+        ai = LookaheadAI.__new__(LookaheadAI)
+        ai.__dict__.update(self.__dict__)
+        ai.world = world
+        ai.copy_from(self)
+        world.subscribe(ai.on_world_event)
+        return ai
+
+    def copy_from(self, other):
+        self.food_field = other.food_field.copy()
+        self.powerup_field = other.powerup_field.copy()
+
+    def on_world_event(self, event, snake, pos, detail):
+        if event == "spawn_food":
+            self.food_field.add_source(self.cell(pos))
+        elif event == "eat":
+            self.food_field.remove_source(self.cell(pos))
+        elif event == "spawn_powerup":
+            self.powerup_field.add_source(self.cell(pos))
+        elif event in ("powerup", "expire_powerup"):
+            self.powerup_field.remove_source(self.cell(pos))
+        elif event == "spawn_obstacle":
+            self.food_field.add_obstacle(self.cell(pos))
+            self.powerup_field.add_obstacle(self.cell(pos))
+        elif event == "expire_obstacle":
+            self.food_field.remove_obstacle(self.cell(pos))
+            self.powerup_field.remove_obstacle(self.cell(pos))
+
+    def candidates(self, snake):
+        # (move, new head, attack) for each move the greedy AI would allow.
+        world = self.world
+        head = snake.head()
+        moves = []
+        for move in DIRECTIONS:
+            new_head = (head[0] + move[0], head[1] + move[1])
+            if len(snake.segments) > 1 and new_head == snake.segments[1]:
+                continue
+            if not world.in_bounds(new_head) or world.is_obstacle(new_head):
+                continue
+            attack = False
+            if world.grid.snake_count[new_head] > snake.segments.count(new_head):
+                # Enemy segments here: only a head-on we win is allowed.
+                blocked = False
+                for other in world.snakes:
+                    if other == snake:
+                        continue
+                    if new_head == other.head():
+                        if snake.aggressive_timer > 0 or len(snake.segments) > len(other.segments):
+                            attack = True
+                        else:
+                            blocked = True
+                            break
+                    elif new_head in other.segments:
+                        blocked = True
+                        break
+                if blocked:
+                    continue
+            moves.append((move, new_head, attack))
+        return moves
+
+    def threatened(self, snake, pos):
+        # Could an enemy that beats us head-on step onto pos next?
+        for other in self.world.snakes:
+            if other is snake or not other.alive:
+                continue
+            head = other.head()
+            if (abs(head[0] - pos[0]) + abs(head[1] - pos[1]) == 1
+                    and (other.aggressive_timer > 0 or len(other.segments) > len(snake.segments))):
+                return True
+        return False
+
+    def search(self, start, buffed, need, deadline):
+        # Returns (best target estimate, free area found from start); the
+        # area is None if the deadline passed first.
+        food_dist = self.food_field.dist
+        pu_dist = None if buffed else self.powerup_field.dist
+        occupied = self.world.grid.snake_count.ravel()
+        items = self.world.grid.items.ravel()
+        neighbors, depth = self.neighbors, self.depth
+
+        best = food_dist[start]
+        if pu_dist is not None:
+            best = min(best, pu_dist[start] * POWERUP_WEIGHT)
+        seen, frontier = {start}, [start]
+        steps, area = 0, 1
+        while frontier and (steps < depth or area < need):
+            if deadline is not None and time.perf_counter() > deadline:
+                return best, None
+            steps += 1
+            scoring = steps <= depth
+            nxt = []
+            for cell in frontier:
+                for nb in neighbors[cell]:
+                    if nb in seen or occupied[nb] or items[nb] == OBSTACLE:
+                        continue
+                    seen.add(nb)
+                    nxt.append(nb)
+                    if scoring:
+                        estimate = food_dist[nb]
+                        if pu_dist is not None and pu_dist[nb] * POWERUP_WEIGHT < estimate:
+                            estimate = pu_dist[nb] * POWERUP_WEIGHT
+                        if steps + estimate < best:
+                            best = steps + estimate
+            area += len(nxt)
+            frontier = nxt
+        return best, area
+
+    def choose(self, snake):
+        moves = self.candidates(snake)
+        if not moves:
+            return None
+        buffed = snake.aggressive_timer > 0 or snake.shield_timer > 0 or snake.multiplier_timer > 0
+        length = len(snake.segments)
+        start = time.perf_counter()
+        best_move, best_rank = None, None
+        for k, (move, new_head, attack) in enumerate(moves):
+            deadline = None
+            if self.budget is not None:
+                deadline = start + self.budget * (k + 1) / len(moves)
+            target, area = self.search(self.cell(new_head), buffed, length, deadline)
+            cost = target
+            if area is not None and area < length:
+                cost += TRAP_PENALTY * (length - area) / length
+            if new_head in snake.segments:
+                cost += SELF_PENALTY
+            if attack:
+                cost -= ATTACK_BONUS
+            if snake.shield_timer == 0 and self.threatened(snake, new_head):
+                cost += THREAT_PENALTY
+            rank = (area is None, cost)
+            if best_rank is None or rank < best_rank:
+                best_move, best_rank = move, rank
+        return best_move
@@ -0,0 +1,472 @@
+"""Struct-of-arrays world state for stepping many independent boards at once.
+
+    envs = BatchWorld(1024, n_snakes=6, seed=0)
+    for _ in range(1000):
+        step_batch(envs)
+
+Every field of every board lives in a NumPy array with a leading batch
+dimension, and ``step_batch`` applies the World tick rules to all boards
+with array operations. Snakes still take their turns in order within a tick,
+as in ``World.step``, so Python work per tick grows with the snake count but
+not with the number of boards.
+
+Cells are flat indices ``x + y * width``. Boards draw from one NumPy
+generator, so a board does not reproduce the World with the same seed, but
+any board can be loaded from or exported to ``World.get_state()`` data.
+"""
+import numpy as np
+
+from ai import MOVES, NO_FOOD_COST, ATTACK_BONUS, BLOCK_BONUS, SELF_PENALTY
+from grid import EMPTY, FOOD, OBSTACLE, POWERUP
+from replay import MOVE_TRAPPED, MOVE_DEAD
+from world import (
+    DIRECTIONS, DEATH_CAUSES, POWERUP_TYPES, GRID_WIDTH, GRID_HEIGHT, FOOD_COUNT,
+    MAX_OBSTACLES, MAX_POWERUPS, OBSTACLE_SPAWN_CHANCE, POWERUP_SPAWN_CHANCE,
+    RESPAWN_TICKS, POWERUP_TICKS, RESPAWN_FLASH_TICKS,
+)
+
+NO_DEATH = -1                  # death_cause entry for a snake that did not die
+AGGRESSIVE, SHIELD, MULTIPLIER = (POWERUP_TYPES.index(t) for t in ("aggressive", "shield", "multiplier"))
+CAUSE = {cause: code for code, cause in enumerate(DEATH_CAUSES)}
+FREE_CELL_TRIES = 8            # Rejection-sampling rounds before scanning the board
+
+
+class BatchWorld:
+    """The state of ``n_envs`` boards with the same size, snakes and caps.
+
+    Per-snake arrays are shaped (envs, snakes). Bodies are ring buffers in
+    ``body`` (envs, snakes, max_length + 1): the head sits at ``head_ptr``
+    and the ``length - 1`` older segments precede it. ``snake_count`` counts
+    segments per cell and ``own_count`` the same per snake. Food, obstacle
+    and powerup slots hold a cell or -1 when empty. After each step,
+    ``moves`` holds each snake's move code and ``death_cause`` the index
+    into DEATH_CAUSES of how it died that tick (NO_DEATH otherwise).
+    """
+
+    def __init__(self, n_envs, n_snakes=6, width=GRID_WIDTH, height=GRID_HEIGHT,
+                 food_count=FOOD_COUNT, max_obstacles=MAX_OBSTACLES, max_powerups=MAX_POWERUPS,
+                 obstacle_chance=OBSTACLE_SPAWN_CHANCE, powerup_chance=POWERUP_SPAWN_CHANCE,
+                 max_length=None, seed=None):
+        B, S, N = n_envs, n_snakes, width * height
+        self.n_envs = n_envs
+        self.n_snakes = n_snakes
+        self.width = width
+        self.height = height
+        self.food_count = food_count
+        self.max_obstacles = max_obstacles
+        self.max_powerups = max_powerups
+        self.obstacle_chance = obstacle_chance
+        self.powerup_chance = powerup_chance
+        # A snake never covers more than every cell once; a lower cap saves
+        # memory, and snakes at the cap stop growing.
+        self.max_length = N if max_length is None else max_length
+        self.ring = self.max_length + 1
+        self.rng = np.random.default_rng(seed)
+        self.tick = 0
+        self.envs = np.arange(B)
+
+        self.items = np.zeros((B, N), dtype=np.int8)
+        self.snake_count = np.zeros((B, N), dtype=np.int16)
+        self.own_count = np.zeros((B, S, N), dtype=np.int8)
+
+        self.body = np.zeros((B, S, self.ring), dtype=np.int32)
+        self.head_ptr = np.zeros((B, S), dtype=np.int64)
+        self.length = np.ones((B, S), dtype=np.int64)
+        self.heads = np.zeros((B, S), dtype=np.int64)
+        self.direction = np.zeros((B, S), dtype=np.int8)
+        self.score = np.zeros((B, S), dtype=np.int64)
+        self.alive = np.ones((B, S), dtype=bool)
+        self.respawn_timer = np.zeros((B, S), dtype=np.int32)
+        self.respawn_flash_timer = np.zeros((B, S), dtype=np.int32)
+        self.aggressive_timer = np.zeros((B, S), dtype=np.int32)
+        self.shield_timer = np.zeros((B, S), dtype=np.int32)
+        self.multiplier_timer = np.zeros((B, S), dtype=np.int32)
+        self.moves = np.full((B, S), MOVE_DEAD, dtype=np.int8)
+        self.death_cause = np.full((B, S), NO_DEATH, dtype=np.int8)
+
+        # food_seq orders foods by spawn so the AI can find the oldest one
+        # (the first in World.foods).
+        self.food_pos = np.full((B, food_count), -1, dtype=np.int64)
+        self.food_seq = np.zeros((B, food_count), dtype=np.int64)
+        self.next_food_seq = 0
+        self.obstacle_pos = np.full((B, max_obstacles), -1, dtype=np.int64)
+        self.obstacle_timer = np.zeros((B, max_obstacles), dtype=np.int32)
+        self.powerup_pos = np.full((B, max_powerups), -1, dtype=np.int64)
+        self.powerup_timer = np.zeros((B, max_powerups), dtype=np.int32)
+        self.powerup_type = np.zeros((B, max_powerups), dtype=np.int8)
+
+        # Snakes start in the upper-left third, as in World.
+        xs = self.rng.integers(0, width // 3 + 1, size=(B, S))
+        ys = self.rng.integers(0, height // 3 + 1, size=(B, S))
+        self.direction[:] = self.rng.integers(0, len(DIRECTIONS), size=(B, S))
+        for i in range(S):
+            self.place_head(self.envs, i, xs[:, i] + ys[:, i] * width)
+        self.refill_food()
+
+    # --- Cells ---
+    def is_free(self, envs, cells):
+        return (self.items[envs, cells] == EMPTY) & (self.snake_count[envs, cells] == 0)
+
+    def random_free_cells(self, envs):
+        # One uniformly random free cell per board in envs, -1 where the
+        # board is full. Rejection sampling settles almost every board;
+        # the rest pick among an explicit free mask.
+        n_cells = self.width * self.height
+        cells = self.rng.integers(0, n_cells, size=len(envs))
+        pending = np.nonzero(~self.is_free(envs, cells))[0]
+        for _ in range(FREE_CELL_TRIES):
+            if len(pending) == 0:
+                return cells
+            cells[pending] = self.rng.integers(0, n_cells, size=len(pending))
+            pending = pending[~self.is_free(envs[pending], cells[pending])]
+        if len(pending):
+            rows = envs[pending]
+            free = (self.items[rows] == EMPTY) & (self.snake_count[rows] == 0)
+            keys = np.where(free, self.rng.random(free.shape), -1.0)
+            cells[pending] = np.where(free.any(1), keys.argmax(1), -1)
+        return cells
+
+    # --- Snake Bodies ---
+    def place_head(self, envs, i, cells):
+        ptr = (self.head_ptr[envs, i] + 1) % self.ring
+        self.head_ptr[envs, i] = ptr
+        self.body[envs, i, ptr] = cells
+        self.heads[envs, i] = cells
+        self.snake_count[envs, cells] += 1
+        self.own_count[envs, i, cells] += 1
+
+    def segment_cells(self, envs, i, start=0):
+        # (len(envs), ring) cells from the head backwards and a mask of the
+        # positions start..length-1; start is a scalar or one per board.
+        k = np.arange(self.ring)
+        idx = (self.head_ptr[envs, i][:, None] - k) % self.ring
+        cells = self.body[envs[:, None], i, idx]
+        mask = (k >= np.reshape(start, (-1, 1))) & (k < self.length[envs, i][:, None])
+        return cells, mask
+
+    def remove_segments(self, envs, i, start):
+        # Drop segments start.. of snake i on envs (start as in segment_cells).
+        cells, mask = self.segment_cells(envs, i, start)
+        rows = np.broadcast_to(envs[:, None], cells.shape)[mask]
+        np.subtract.at(self.snake_count, (rows, cells[mask]), 1)
+        np.subtract.at(self.own_count, (rows, i, cells[mask]), 1)
+        self.length[envs, i] = np.minimum(self.length[envs, i], start)
+
+    def pop_tail(self, envs, i):
+        tail = self.body[envs, i, (self.head_ptr[envs, i] - self.length[envs, i] + 1) % self.ring]
+        self.snake_count[envs, tail] -= 1
+        self.own_count[envs, i, tail] -= 1
+        self.length[envs, i] -= 1
+
+    def kill(self, mask, i, cause):
+        self.alive[mask, i] = False
+        self.respawn_timer[mask, i] = RESPAWN_TICKS
+        self.death_cause[mask, i] = CAUSE[cause]
+
+    def respawn(self, envs, i):
+        cells = self.random_free_cells(envs)
+        full = cells < 0
+        cells[full] = self.rng.integers(0, self.width * self.height, size=int(full.sum()))
+        self.remove_segments(envs, i, 0)
+        self.head_ptr[envs, i] = 0
+        self.length[envs, i] = 1
+        self.place_head(envs, i, cells)
+        self.direction[envs, i] = self.rng.integers(0, len(DIRECTIONS), size=len(envs))
+        self.alive[envs, i] = True
+        self.respawn_flash_timer[envs, i] = RESPAWN_FLASH_TICKS
+
+    # --- Spawning & Timed Items ---
+    def spawn_into(self, positions, envs):
+        # Put a random free cell into the first empty slot of each board in
+        # envs; returns the boards and slots that got one.
+        cells = self.random_free_cells(envs)
+        ok = cells >= 0
+        envs, cells = envs[ok], cells[ok]
+        slots = (positions[envs] < 0).argmax(1)
+        positions[envs, slots] = cells
+        return envs, slots
+
+    def refill_food(self):
+        for _ in range(self.food_count):
+            envs = np.nonzero((self.food_pos < 0).any(1))[0]
+            if len(envs) == 0:
+                break
+            envs, slots = self.spawn_into(self.food_pos, envs)
+            if len(envs) == 0:
+                break
+            self.items[envs, self.food_pos[envs, slots]] = FOOD
+            self.food_seq[envs, slots] = self.next_food_seq + np.arange(len(envs))
+            self.next_food_seq += len(envs)
+
+    def update_obstacles(self):
+        active = self.obstacle_pos >= 0
+        self.obstacle_timer[active] -= 1
+        expired = active & (self.obstacle_timer <= 0)
+        if expired.any():
+            rows, slots = np.nonzero(expired)
+            self.items[rows, self.obstacle_pos[rows, slots]] = EMPTY
+            self.obstacle_pos[rows, slots] = -1
+        room = (self.obstacle_pos < 0).any(1)
+        envs = np.nonzero(room & (self.rng.random(self.n_envs) < self.obstacle_chance))[0]
+        if len(envs):
+            envs, slots = self.spawn_into(self.obstacle_pos, envs)
+            self.items[envs, self.obstacle_pos[envs, slots]] = OBSTACLE
+            self.obstacle_timer[envs, slots] = self.rng.integers(50, 151, size=len(envs))
+
+    def update_powerups(self):
+        active = self.powerup_pos >= 0
+        self.powerup_timer[active] -= 1
+        expired = active & (self.powerup_timer <= 0)
+        if expired.any():
+            rows, slots = np.nonzero(expired)
+            self.items[rows, self.powerup_pos[rows, slots]] = EMPTY
+            self.powerup_pos[rows, slots] = -1
+        room = (self.powerup_pos < 0).any(1)
+        envs = np.nonzero(room & (self.rng.random(self.n_envs) < self.powerup_chance))[0]
+        if len(envs):
+            envs, slots = self.spawn_into(self.powerup_pos, envs)
+            self.items[envs, self.powerup_pos[envs, slots]] = POWERUP
+            self.powerup_timer[envs, slots] = self.rng.integers(100, 201, size=len(envs))
+            self.powerup_type[envs, slots] = self.rng.integers(0, len(POWERUP_TYPES), size=len(envs))
+
+    # --- AI ---
+    def plan(self, i):
+        """Move code per board for snake i, as get_direction_for_snake picks it."""
+        W, H = self.width, self.height
+        rows = self.envs[:, None]
+        heads = self.heads
+        hx, hy = heads % W, heads // W
+        nx = hx[:, i, None] + MOVES[:, 0]                                  # (B, 4)
+        ny = hy[:, i, None] + MOVES[:, 1]
+        valid = (nx >= 0) & (nx < W) & (ny >= 0) & (ny < H)
+        cells = np.where(valid, nx + ny * W, 0)
+        valid &= self.items[rows, cells] != OBSTACLE
+        length = self.length[:, i]
+        second = self.body[self.envs, i, (self.head_ptr[:, i] - 1) % self.ring]
+        valid &= ~((length > 1)[:, None] & (cells == second[:, None]))
+        own = self.own_count[rows, i, cells] > 0
+
+        # An enemy on the cell rejects the move unless it is only its head
+        # and we win the head-on.
+        wins_all = (self.aggressive_timer[:, i, None] > 0) | (length[:, None] > self.length)
+        attack = np.zeros_like(valid)
+        for j in range(self.n_snakes):
+            if j == i:
+                continue
+            head_hit = cells == heads[:, j, None]
+            wins = wins_all[:, j, None]
+            body_hit = self.own_count[rows, j, cells] > 0
+            valid &= ~((head_hit & ~wins) | (~head_hit & body_hit))
+            attack |= head_hit & wins
+
+        food_active = self.food_pos >= 0
+        has_food = food_active.any(1)
+        fx, fy = self.food_pos % W, self.food_pos // W
+        dist = np.abs(nx[:, :, None] - fx[:, None, :]) + np.abs(ny[:, :, None] - fy[:, None, :])
+        food_cost = np.where(food_active[:, None, :], dist, np.iinfo(np.int64).max).min(-1)
+        cost = np.where(has_food[:, None], food_cost, NO_FOOD_COST).astype(np.float64)
+        pu_active = self.powerup_pos >= 0
+        unbuffed = ((self.aggressive_timer[:, i] == 0) & (self.shield_timer[:, i] == 0)
+                    & (self.multiplier_timer[:, i] == 0) & pu_active.any(1))
+        if unbuffed.any():
+            px, py = self.powerup_pos % W, self.powerup_pos // W
+            dist = np.abs(nx[:, :, None] - px[:, None, :]) + np.abs(ny[:, :, None] - py[:, None, :])
+            pu_cost = np.where(pu_active[:, None, :], dist, np.iinfo(np.int64).max).min(-1) * 0.7
+            cost = np.where(unbuffed[:, None], np.minimum(cost, pu_cost), cost)
+
+        # Blocking bonus against each enemy nearer the oldest food, in order.
+        oldest = np.where(food_active, self.food_seq, np.iinfo(np.int64).max).argmin(1)
+        first_food = self.food_pos[self.envs, oldest]
+        ffx, ffy = first_food % W, first_food // W
+        for j in range(self.n_snakes):
+            if j == i:
+                continue
+            to_food = np.abs(hx[:, j] - ffx) + np.abs(hy[:, j] - ffy)
+            adjacent = np.abs(nx - hx[:, j, None]) + np.abs(ny - hy[:, j, None]) == 1
+            cost -= BLOCK_BONUS * (adjacent & has_food[:, None] & (to_food[:, None] < cost))
+
+        cost += SELF_PENALTY * own
+        cost -= ATTACK_BONUS * attack
+        cost = np.where(valid, cost, np.inf)
+        return np.where(valid.any(1), cost.argmin(1), MOVE_TRAPPED)
+
+    # --- Moves ---
+    def move(self, i, choice):
+        """Apply move codes for snake i on every board where it is alive."""
+        W = self.width
+        moving = self.alive[:, i].copy()
+        trapped = moving & (choice == MOVE_TRAPPED)
+        self.kill(trapped, i, "trapped")
+        moving &= ~trapped
+        self.direction[moving, i] = choice[moving]
+        step = MOVES[np.where(moving, choice, 0)]
+        x = self.heads[:, i] % W + step[:, 0]
+        y = self.heads[:, i] // W + step[:, 1]
+        in_bounds = (x >= 0) & (x < W) & (y >= 0) & (y < self.height)
+        self.kill(moving & ~in_bounds, i, "wall")
+        moving &= in_bounds
+        cells = np.where(moving, x + y * W, 0)
+        hit_obstacle = moving & (self.items[self.envs, cells] == OBSTACLE)
+        self.kill(hit_obstacle, i, "obstacle")
+        moving &= ~hit_obstacle
+
+        # Head-on collisions, resolved against each enemy in order; losing
+        # one ends the scan.
+        scanning = moving.copy()
+        for j in range(self.n_snakes):
+            if j == i:
+                continue
+            hit = scanning & (cells == self.heads[:, j])
+            if not hit.any():
+                continue
+            win = hit & ((self.aggressive_timer[:, i] > 0) | (self.length[:, i] > self.length[:, j]))
+            shielded = win & (self.shield_timer[:, j] > 0)
+            self.shield_timer[shielded, j] = 0
+            self.kill(win & ~shielded, j, "attacked")
+            self.score[win, i] += 2
+            lose = hit & ~win
+            saved = lose & (self.shield_timer[:, i] > 0)
+            self.shield_timer[saved, i] = 0
+            self.kill(lose & ~saved, i, "head_on")
+            scanning &= ~lose
+        moving &= self.alive[:, i]
+
+        envs = np.nonzero(moving)[0]
+        if len(envs) == 0:
+            return
+        cells = cells[envs]
+        self.place_head(envs, i, cells)
+        self.length[envs, i] += 1
+
+        ate = self.items[envs, cells] == FOOD
+        if ate.any():
+            eaters = envs[ate]
+            self.score[eaters, i] += np.where(self.multiplier_timer[eaters, i] > 0, 2, 1)
+            slots = (self.food_pos[eaters] == cells[ate, None]).argmax(1)
+            self.food_pos[eaters, slots] = -1
+            self.items[eaters, cells[ate]] = EMPTY
+        grow = ate & (self.length[envs, i] <= self.max_length)
+        self.pop_tail(envs[~grow], i)
+
+        # Self-collision: cut from the second occurrence of the head.
+        cut = self.own_count[envs, i, cells] > 1
+        if cut.any():
+            cutters = envs[cut]
+            segs, mask = self.segment_cells(cutters, i)
+            seen = np.cumsum((segs == cells[cut, None]) & mask, axis=1)
+            self.remove_segments(cutters, i, (seen == 2).argmax(1))
+
+        picked = self.items[envs, cells] == POWERUP
+        if picked.any():
+            pickers, where = envs[picked], cells[picked]
+            slots = (self.powerup_pos[pickers] == where[:, None]).argmax(1)
+            kinds = self.powerup_type[pickers, slots]
+            self.aggressive_timer[pickers[kinds == AGGRESSIVE], i] = POWERUP_TICKS
+            self.shield_timer[pickers[kinds == SHIELD], i] = POWERUP_TICKS
+            self.multiplier_timer[pickers[kinds == MULTIPLIER], i] = POWERUP_TICKS
+            self.powerup_pos[pickers, slots] = -1
+            self.items[pickers, where] = EMPTY
+
+        timers = (self.aggressive_timer, self.shield_timer, self.multiplier_timer, self.respawn_flash_timer)
+        for timer in timers:
+            timer[envs, i] = np.maximum(timer[envs, i] - 1, 0)
+
+    # --- World Interop ---
+    def load_state(self, b, state):
+        # Set board b from World.get_state() data (its RNG state is ignored).
+        W = self.width
+        envs = np.array([b])
+        self.items[b] = EMPTY
+        self.snake_count[b] = 0
+        self.own_count[b] = 0
+        for i, data in enumerate(state['snakes']):
+            cells = [x + y * W for x, y in data['segments']]
+            self.head_ptr[b, i] = 0
+            self.length[b, i] = 0
+            for cell in reversed(cells):
+                self.place_head(envs, i, np.array([cell]))
+                self.length[b, i] += 1
+            self.direction[b, i] = DIRECTIONS.index(data['direction'])
+            for field in ('score', 'alive', 'respawn_timer', 'respawn_flash_timer',
+                          'aggressive_timer', 'shield_timer', 'multiplier_timer'):
+                getattr(self, field)[b, i] = data[field]
+        self.food_pos[b] = -1
+        for slot, (x, y) in enumerate(state['foods']):
+            self.food_pos[b, slot] = x + y * W
+            self.food_seq[b, slot] = self.next_food_seq
+            self.next_food_seq += 1
+            self.items[b, x + y * W] = FOOD
+        self.obstacle_pos[b] = -1
+        for slot, ((x, y), timer) in enumerate(state['obstacles']):
+            self.obstacle_pos[b, slot] = x + y * W
+            self.obstacle_timer[b, slot] = timer
+            self.items[b, x + y * W] = OBSTACLE
+        self.powerup_pos[b] = -1
+        for slot, ((x, y), timer, pu_type) in enumerate(state['powerups']):
+            self.powerup_pos[b, slot] = x + y * W
+            self.powerup_timer[b, slot] = timer
+            self.powerup_type[b, slot] = POWERUP_TYPES.index(pu_type)
+            self.items[b, x + y * W] = POWERUP
+
+    def get_state(self, b):
+        # World.get_state() layout for board b, without the 'rng' entry.
+        W = self.width
+
+        def xy(cell):
+            return (int(cell) % W, int(cell) // W)
+
+        snakes = []
+        for i in range(self.n_snakes):
+            cells, mask = self.segment_cells(np.array([b]), i)
+            data = {
+                'direction': DIRECTIONS[self.direction[b, i]],
+                'score': int(self.score[b, i]),
+                'alive': bool(self.alive[b, i]),
+            }
+            for field in ('respawn_timer', 'respawn_flash_timer', 'aggressive_timer',
+                          'shield_timer', 'multiplier_timer'):
+                data[field] = int(getattr(self, field)[b, i])
+            data['segments'] = [xy(cell) for cell in cells[0][mask[0]]]
+            snakes.append(data)
+        foods = [slot for slot in np.argsort(self.food_seq[b]) if self.food_pos[b, slot] >= 0]
+        return {
+            'tick': self.tick,
+            'snakes': snakes,
+            'foods': [xy(self.food_pos[b, slot]) for slot in foods],
+            'obstacles': [(xy(pos), int(timer)) for pos, timer
+                          in zip(self.obstacle_pos[b], self.obstacle_timer[b]) if pos >= 0],
+            'powerups': [(xy(pos), int(timer), POWERUP_TYPES[kind]) for pos, timer, kind
+                         in zip(self.powerup_pos[b], self.powerup_timer[b], self.powerup_type[b])
+                         if pos >= 0],
+        }
+
+
+# --- Stepping ---
+def step_batch(batch, actions=None):
+    """Advance every board in ``batch`` by one tick.
+
+    ``actions`` optionally overrides the built-in AI: an (envs, snakes) array
+    of DIRECTIONS indices, with -1 for snakes the AI should steer.
+    """
+    batch.death_cause[:] = NO_DEATH
+    batch.update_obstacles()
+    batch.update_powerups()
+    batch.refill_food()
+    for i in range(batch.n_snakes):
+        alive = batch.alive[:, i].copy()
+        if actions is None or (actions[:, i] < 0).any():
+            choice = batch.plan(i)
+            if actions is not None:
+                choice = np.where(actions[:, i] < 0, choice, actions[:, i])
+        else:
+            choice = actions[:, i].astype(np.int64)
+        batch.moves[:, i] = np.where(alive, choice, MOVE_DEAD)
+        batch.move(i, choice)
+
+        dead = np.nonzero(~alive)[0]
+        if len(dead):
+            batch.respawn_timer[dead, i] -= 1
+            due = dead[batch.respawn_timer[dead, i] <= 0]
+            if len(due):
+                batch.respawn(due, i)
+    batch.tick += 1
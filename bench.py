@@ -0,0 +1,328 @@
+"""Reproducible performance benchmarks, runnable headless.
+
+    python bench.py                              # run the default sweep
+    python bench.py --save baseline.json         # ... and store it as a baseline
+    python bench.py --baseline baseline.json     # compare against a stored baseline
+
+Benchmarks cover the tick rules (ticks/sec), food and snake respawn cost as
+board occupancy grows, AI latency against snake count and length, batched
+stepping throughput, world fork/restore against a get_state/load_state
+round trip, and the per-frame cost of the drawing helpers. Worlds
+are built from fixed seeds and each case reports the median of ``--repeat``
+timed batches. Against a baseline, any case slower by more than
+``--tolerance`` is listed as a regression and the exit status is 1.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+import time
+
+# Render benchmarks import the game module; keep pygame off real devices.
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import numpy as np
+
+from ai import get_direction_for_snake, plan_moves
+from batch import BatchWorld, step_batch
+from grid import OBSTACLE
+from world import DEFAULT_SNAKES, scaled_world
+
+BENCHMARKS = ["tick", "spawn", "ai", "batch", "snapshot", "render"]
+OCCUPANCIES = [0.0, 0.5, 0.9, 0.99]
+SNAKE_LENGTHS = [1, 16, 64]
+EFFECT_COUNTS = [16, 64, 256]
+
+
+# --- Helpers ---
+def measure(fn, repeat, number):
+    # Median seconds per call over `repeat` batches of `number` calls.
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - start) / number)
+    return statistics.median(times)
+
+
+def serpentine(width, height):
+    # Every cell once, each adjacent to the previous one.
+    for y in range(height):
+        xs = range(width) if y % 2 == 0 else range(width - 1, -1, -1)
+        for x in xs:
+            yield (x, y)
+
+
+def make_long_world(n_snakes, length, seed, size=None):
+    # n_snakes of exactly `length` segments laid end to end along a
+    # serpentine path, one free cell between consecutive snakes.
+    if size is None:
+        size = max(50, math.ceil(math.sqrt(2 * n_snakes * (length + 1))))
+    world = scaled_world(n_snakes, size, size, seed=seed)
+    path = serpentine(size, size)
+    state = world.get_state()
+    for data in state['snakes']:
+        cells = [next(path) for _ in range(length)]
+        next(path)
+        cells.reverse()
+        data['segments'] = cells
+        if length > 1:
+            data['direction'] = (cells[0][0] - cells[1][0], cells[0][1] - cells[1][1])
+    # Drop items that would sit under the new bodies.
+    occupied = {pos for data in state['snakes'] for pos in data['segments']}
+    state['foods'] = [pos for pos in state['foods'] if pos not in occupied]
+    world.load_state(state)
+    world.refill_food()
+    return world
+
+
+# --- Benchmarks ---
+# Each yields (name, params, seconds per op, label of one op).
+def bench_tick(args):
+    for size in args.sizes:
+        for n in args.snakes:
+            for batched in (False, True):
+                world = scaled_world(n, size, size, batched_ai=batched, seed=args.seed)
+                for _ in range(50):
+                    world.step()
+                seconds = measure(world.step, args.repeat, 50)
+                yield "tick", {'size': size, 'snakes': n, 'batched': batched}, seconds, "tick"
+
+
+def bench_spawn(args):
+    for size in args.sizes:
+        for occupancy in OCCUPANCIES:
+            world = scaled_world(len(DEFAULT_SNAKES), size, size, seed=args.seed)
+            # Fill the board with permanent obstacles (not in world.obstacles,
+            # so nothing ever expires them).
+            n_fill = int(world.grid.n_free * occupancy)
+            for _ in range(n_fill):
+                world.grid.set_item(world.random_free_cell(), OBSTACLE)
+            params = {'size': size, 'occupancy': occupancy}
+
+            def spawn_food():
+                pos, _ = world.foods.popitem()
+                world.grid.clear_item(pos)
+                world.refill_food()
+            yield "spawn_food", params, measure(spawn_food, args.repeat, 200), "food"
+
+            snake = world.snakes[0]
+            respawn = measure(lambda: world.respawn_snake(snake), args.repeat, 200)
+            yield "respawn_snake", params, respawn, "respawn"
+
+
+def bench_ai(args):
+    for n in args.snakes:
+        for length in SNAKE_LENGTHS:
+            world = make_long_world(n, length, args.seed)
+            snakes = world.snakes
+
+            def decide_all():
+                for snake in snakes:
+                    get_direction_for_snake(world, snake)
+            params = {'snakes': n, 'length': length}
+            seconds = measure(decide_all, args.repeat, 10) / n
+            yield "get_direction_for_snake", params, seconds, "call"
+            seconds = measure(lambda: plan_moves(world), args.repeat, 10)
+            yield "plan_moves", params, seconds, "plan"
+
+
+def bench_batch(args):
+    # Default-sized boards with the default six snakes, per board-tick.
+    for n_envs in args.envs:
+        batch = BatchWorld(n_envs, seed=args.seed)
+        for _ in range(20):
+            step_batch(batch)
+        seconds = measure(lambda: step_batch(batch), args.repeat, 20) / n_envs
+        yield "step_batch", {'envs': n_envs}, seconds, "board-tick"
+
+
+def bench_snapshot(args):
+    for size in args.sizes:
+        for n in args.snakes:
+            world = scaled_world(n, size, size, seed=args.seed)
+            for _ in range(50):
+                world.step()
+            params = {'size': size, 'snakes': n}
+            yield "fork", params, measure(world.fork, args.repeat, 200), "fork"
+            snapshot = world.snapshot()
+            yield "restore", params, measure(lambda: world.restore(snapshot), args.repeat, 200), "restore"
+            seconds = measure(lambda: world.load_state(world.get_state()), args.repeat, 20)
+            yield "state_round_trip", params, seconds, "round trip"
+
+
+def bench_render(args):
+    import snake as game
+
+    # Renderers draw whatever is in the module-level effect pool, so every
+    # case below sets up its own and the game's is put back afterwards.
+    game_effects = game.effects
+    try:
+        yield from render_cases(args)
+    finally:
+        game.effects = game_effects
+
+
+def render_cases(args):
+    import pygame
+    import snake as game
+
+    board = pygame.Surface((game.BOARD_WIDTH, game.BOARD_HEIGHT))
+    game.effects = game.EffectPool()
+    yield "draw_background", {}, measure(lambda: game.draw_background(board), args.repeat, 5), "frame"
+
+    for n in args.snakes:
+        for length in SNAKE_LENGTHS:
+            world = make_long_world(n, length, args.seed, size=game.GRID_WIDTH) \
+                if n * (length + 1) <= game.GRID_WIDTH * game.GRID_HEIGHT else None
+            if world is None:
+                continue
+
+            def draw_snakes():
+                for snake in world.snakes:
+                    game.draw_snake(board, snake)
+            params = {'snakes': n, 'length': length}
+            yield "draw_snake", params, measure(draw_snakes, args.repeat, 20), "frame"
+
+            # Whole-board redraws: per-entity draw calls against one raster.
+            renderers = (("board_redraw", game.BoardRenderer), ("raster_redraw", game.RasterBoardRenderer))
+            for name, cls in renderers:
+                game.effects = game.EffectPool()
+                renderer = cls(board)
+
+                def redraw():
+                    renderer.invalidate()
+                    renderer.render(world)
+                yield name, {'snakes': n, 'length': length}, measure(redraw, args.repeat, 20), "frame"
+
+    rng = np.random.default_rng(args.seed)
+    for count in EFFECT_COUNTS:
+        pool = game.effects = game.EffectPool(max(count, game.EFFECT_CAPACITY))
+
+        def draw_effects():
+            # Keep the pool at `count` live effects of mixed ages.
+            while len(pool) < count:
+                pos = tuple(int(v) for v in rng.integers(0, game.GRID_WIDTH, 2))
+                pool.add(pos, game.EFFECT_COLORS["eat"])
+                pool.timers[pool.count - 1] = int(rng.integers(1, game.EFFECT_FRAMES + 1))
+            game.update_and_draw_effects(board)
+        yield "update_and_draw_effects", {'effects': count}, measure(draw_effects, args.repeat, 20), "frame"
+
+    for n in args.snakes:
+        for name, cls in (("board_frame", game.BoardRenderer), ("raster_frame", game.RasterBoardRenderer)):
+            game.effects = game.EffectPool()
+            world = scaled_world(n, game.GRID_WIDTH, game.GRID_HEIGHT, seed=args.seed)
+            renderer = cls(board)
+            renderer.render(world)
+
+            def frame():
+                world.step()
+                renderer.render(world)
+            yield name, {'snakes': n}, measure(frame, args.repeat, 20), "frame"
+
+
+BENCH_FUNCS = {
+    "tick": bench_tick,
+    "spawn": bench_spawn,
+    "ai": bench_ai,
+    "batch": bench_batch,
+    "snapshot": bench_snapshot,
+    "render": bench_render,
+}
+
+
+# --- Results & Baselines ---
+def case_key(name, params):
+    if not params:
+        return name
+    return name + "[" + ",".join(f"{k}={v}" for k, v in params.items()) + "]"
+
+
+def run(args):
+    results = {}
+    for bench in args.only:
+        for name, params, seconds, unit in BENCH_FUNCS[bench](args):
+            key = case_key(name, params)
+            results[key] = {'seconds': seconds, 'unit': unit}
+            print(f"{key:60s} {seconds * 1e6:12.1f} us/{unit} {1 / seconds:12.0f} {unit}/s", flush=True)
+    return results
+
+
+def environment():
+    import pygame
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pygame': pygame.version.ver,
+        'machine': platform.machine(),
+        'system': platform.system(),
+    }
+
+
+def compare(results, baseline, tolerance):
+    # Returns the keys that got slower than the baseline allows.
+    regressions = []
+    print()
+    print(f"{'case':60s} {'baseline':>12s} {'now':>12s} {'change':>8s}")
+    for key, result in results.items():
+        base = baseline['results'].get(key)
+        if base is None:
+            continue
+        change = result['seconds'] / base['seconds'] - 1
+        flag = ""
+        if change > tolerance:
+            flag = "  REGRESSION"
+            regressions.append(key)
+        print(f"{key:60s} {base['seconds'] * 1e6:12.1f} {result['seconds'] * 1e6:12.1f} {change:+8.1%}{flag}")
+    if baseline.get('environment') != environment():
+        print("note: baseline was recorded in a different environment", baseline.get('environment'))
+    return regressions
+
+
+# --- CLI ---
+def int_list(text):
+    return [int(v) for v in text.split(",")]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Snake Mayhem's simulation and rendering.")
+    parser.add_argument("--only", type=lambda s: s.split(","), default=BENCHMARKS,
+                        help=f"comma-separated subset of {','.join(BENCHMARKS)}")
+    parser.add_argument("--sizes", type=int_list, default=[50, 100, 200], help="grid sizes to sweep")
+    parser.add_argument("--snakes", type=int_list, default=[6, 24, 96], help="snake counts to sweep")
+    parser.add_argument("--envs", type=int_list, default=[64, 1024], help="board counts for step_batch")
+    parser.add_argument("--repeat", type=int, default=5, help="timed batches per case (median is kept)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="write results here as a baseline")
+    parser.add_argument("--baseline", help="compare against this stored baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed slowdown against the baseline (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+    unknown = set(args.only) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(sorted(unknown))}")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = run(args)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'environment': environment(), 'results': results}, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s)")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
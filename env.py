@@ -0,0 +1,132 @@
+"""Gym-style environment for steering snakes with an external agent.
+
+    env = SnakeEnv(n_envs=64, controlled=[0])
+    obs = env.reset(seed=0)
+    while True:
+        actions = agent(obs)                          # (envs, agents) DIRECTIONS indices
+        obs, rewards, terminated, truncated, info = env.step(actions)
+        if truncated:
+            obs = env.reset()
+
+Boards run on a BatchWorld; snakes that are not controlled keep the built-in
+AI. Observations are float32 grids shaped (envs, agents, channels, height,
+width), one stack per controlled snake from its own point of view. They are
+written in place into one preallocated buffer and ``reset``/``step`` return
+that buffer itself, so nothing is allocated per step: copy an observation
+to keep it past the next step.
+"""
+import numpy as np
+
+from batch import BatchWorld, step_batch, NO_DEATH
+from grid import FOOD, OBSTACLE
+from world import DIRECTIONS, POWERUP_TYPES, POWERUP_TICKS, GRID_WIDTH, GRID_HEIGHT
+
+# --- Observation Channels ---
+OWN_BODY = 0
+OWN_HEAD = 1
+ENEMY_BODY = 2
+ENEMY_HEAD = 3
+FOOD_CHANNEL = 4
+OBSTACLE_CHANNEL = 5
+POWERUP_CHANNEL = 6          # one channel per POWERUP_TYPES entry, in order
+AGGRESSIVE_TIMER = POWERUP_CHANNEL + len(POWERUP_TYPES)   # own buff timers as
+SHIELD_TIMER = AGGRESSIVE_TIMER + 1                       # planes, 1.0 = just
+MULTIPLIER_TIMER = AGGRESSIVE_TIMER + 2                   # picked up
+N_CHANNELS = MULTIPLIER_TIMER + 1
+
+N_ACTIONS = len(DIRECTIONS)
+MAX_TICKS = 2000             # Episode length; every board truncates together
+
+
+class SnakeEnv:
+    """``n_envs`` boards with the snakes in ``controlled`` steered by actions.
+
+    ``step`` takes an (envs, agents) array of DIRECTIONS indices and returns
+    ``(obs, rewards, terminated, truncated, info)``: rewards are each
+    controlled snake's score gained this tick, terminated marks the snakes
+    that died this tick (they respawn and play on), and truncated is True
+    once the episode has run ``max_ticks``. ``info`` holds the BatchWorld.
+    """
+
+    def __init__(self, n_envs=1, n_snakes=6, controlled=(0,), width=GRID_WIDTH, height=GRID_HEIGHT,
+                 max_ticks=MAX_TICKS, **world_options):
+        self.n_envs = n_envs
+        self.n_snakes = n_snakes
+        self.controlled = list(controlled)
+        self.width = width
+        self.height = height
+        self.max_ticks = max_ticks
+        self.world_options = world_options
+        self.world = None
+        self.seed = None
+
+        n_agents = len(self.controlled)
+        self.observation_shape = (n_envs, n_agents, N_CHANNELS, height, width)
+        self.obs = np.zeros(self.observation_shape, dtype=np.float32)
+        self.rewards = np.zeros((n_envs, n_agents), dtype=np.float32)
+        self.terminated = np.zeros((n_envs, n_agents), dtype=bool)
+        self.actions = np.full((n_envs, n_snakes), -1, dtype=np.int64)
+        self.last_score = np.zeros((n_envs, n_agents), dtype=np.int64)
+        self.enemy_count = np.zeros((n_envs, width * height), dtype=np.int16)
+        self.timer_scale = np.zeros(n_envs, dtype=np.float32)
+
+    def reset(self, seed=None):
+        # A fresh seed each reset unless given, continuing from the last one.
+        if seed is None and self.seed is not None:
+            seed = self.seed + 1
+        self.seed = seed
+        self.world = BatchWorld(self.n_envs, self.n_snakes, self.width, self.height,
+                                seed=seed, **self.world_options)
+        self.last_score[:] = self.world.score[:, self.controlled]
+        self.observe()
+        return self.obs
+
+    def step(self, actions):
+        world = self.world
+        self.actions[:, self.controlled] = actions
+        step_batch(world, self.actions)
+        score = world.score[:, self.controlled]
+        np.subtract(score, self.last_score, out=self.rewards, casting='unsafe')
+        self.last_score[:] = score
+        np.not_equal(world.death_cause[:, self.controlled], NO_DEATH, out=self.terminated)
+        truncated = world.tick >= self.max_ticks
+        self.observe()
+        return self.obs, self.rewards, self.terminated, truncated, {'world': world}
+
+    # --- Observations ---
+    def observe(self):
+        world = self.world
+        B, H, W = self.n_envs, self.height, self.width
+        items = world.items.reshape(B, H, W)
+        envs = world.envs
+        active_pus = world.powerup_pos >= 0
+        pu_envs = np.broadcast_to(envs[:, None], active_pus.shape)[active_pus]
+        pu_cells = world.powerup_pos[active_pus]
+        pu_types = world.powerup_type[active_pus].astype(np.int64)
+        for a, i in enumerate(self.controlled):
+            obs = self.obs[:, a]
+            own = world.own_count[:, i].reshape(B, H, W)
+            np.greater(own, 0, out=obs[:, OWN_BODY])
+            np.subtract(world.snake_count, world.own_count[:, i], out=self.enemy_count)
+            np.greater(self.enemy_count.reshape(B, H, W), 0, out=obs[:, ENEMY_BODY])
+            np.equal(items, FOOD, out=obs[:, FOOD_CHANNEL])
+            np.equal(items, OBSTACLE, out=obs[:, OBSTACLE_CHANNEL])
+
+            # Sparse channels are cleared and set through flat per-board views.
+            heads = obs[:, OWN_HEAD].reshape(B, H * W)
+            heads.fill(0)
+            heads[envs, world.heads[:, i]] = 1
+            enemy_heads = obs[:, ENEMY_HEAD].reshape(B, H * W)
+            enemy_heads.fill(0)
+            for j in range(self.n_snakes):
+                if j != i:
+                    enemy_heads[envs, world.heads[:, j]] = 1
+            powerups = obs[:, POWERUP_CHANNEL:POWERUP_CHANNEL + len(POWERUP_TYPES)].reshape(B, -1)
+            powerups.fill(0)
+            powerups[pu_envs, pu_types * H * W + pu_cells] = 1
+
+            for channel, timer in ((AGGRESSIVE_TIMER, world.aggressive_timer),
+                                   (SHIELD_TIMER, world.shield_timer),
+                                   (MULTIPLIER_TIMER, world.multiplier_timer)):
+                np.divide(timer[:, i], POWERUP_TICKS, out=self.timer_scale)
+                obs[:, channel] = self.timer_scale[:, None, None]
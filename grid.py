@@ -0,0 +1,106 @@
+import random
+
+import numpy as np
+
+# --- Cell Contents ---
+EMPTY    = 0
+FOOD     = 1
+OBSTACLE = 2
+POWERUP  = 3
+
+
+class OccupancyGrid:
+    """Per-cell occupancy for a World, kept in sync as entities move.
+
+    ``items[x, y]`` holds the item type on a cell (EMPTY/FOOD/OBSTACLE/POWERUP)
+    and ``snake_count[x, y]`` how many snake segments cover it (snakes may
+    overlap, e.g. dead bodies waiting to respawn). Free cells are tracked in a
+    dense index array with swap-remove, so marking a cell used/free and
+    picking a random free cell are all O(1) regardless of board size.
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.items = np.zeros((width, height), dtype=np.int8)
+        self.snake_count = np.zeros((width, height), dtype=np.int32)
+        n_cells = width * height
+        # free[:n_free] are the flat indices of free cells; free_slot maps a
+        # flat index back to its slot in free, or -1 if the cell is in use.
+        self.free = np.arange(n_cells, dtype=np.int32)
+        self.free_slot = np.arange(n_cells, dtype=np.int32)
+        self.n_free = n_cells
+
+    def copy(self):
+        # Arrays are copied as they are, free-list order included, so the
+        # copy picks the same random free cells as the original.
+        grid = OccupancyGrid.__new__(OccupancyGrid)
+        grid.width = self.width
+        grid.height = self.height
+        grid.items = self.items.copy()
+        grid.snake_count = self.snake_count.copy()
+        grid.free = self.free.copy()
+        grid.free_slot = self.free_slot.copy()
+        grid.n_free = self.n_free
+        return grid
+
+    def copy_from(self, other):
+        # Same as copy(), into this grid's arrays (same size only).
+        np.copyto(self.items, other.items)
+        np.copyto(self.snake_count, other.snake_count)
+        np.copyto(self.free, other.free)
+        np.copyto(self.free_slot, other.free_slot)
+        self.n_free = other.n_free
+
+    # --- Free-cell index ---
+    def _mark_used(self, x, y):
+        idx = x + y * self.width
+        slot = self.free_slot[idx]
+        if slot < 0:
+            return
+        last = self.free[self.n_free - 1]
+        self.free[slot] = last
+        self.free_slot[last] = slot
+        self.free[self.n_free - 1] = idx
+        self.free_slot[idx] = -1
+        self.n_free -= 1
+
+    def _mark_free(self, x, y):
+        idx = x + y * self.width
+        if self.free_slot[idx] >= 0:
+            return
+        self.free[self.n_free] = idx
+        self.free_slot[idx] = self.n_free
+        self.n_free += 1
+
+    def random_free_cell(self, rng=random):
+        if self.n_free == 0:
+            return None
+        idx = int(self.free[rng.randrange(self.n_free)])
+        return (idx % self.width, idx // self.width)
+
+    def is_free(self, pos):
+        return self.free_slot[pos[0] + pos[1] * self.width] >= 0
+
+    # --- Snake segments ---
+    def add_snake(self, pos):
+        self.snake_count[pos] += 1
+        self._mark_used(*pos)
+
+    def remove_snake(self, pos):
+        self.snake_count[pos] -= 1
+        if self.snake_count[pos] == 0 and self.items[pos] == EMPTY:
+            self._mark_free(*pos)
+
+    # --- Items ---
+    def item_at(self, pos):
+        return self.items[pos]
+
+    def set_item(self, pos, kind):
+        self.items[pos] = kind
+        self._mark_used(*pos)
+
+    def clear_item(self, pos):
+        self.items[pos] = EMPTY
+        if self.snake_count[pos] == 0:
+            self._mark_free(*pos)
@@ -0,0 +1,118 @@
+"""Per-phase timing for the game loop, with rolling stats and trace export."""
+import json
+import time
+from collections import deque
+
+FRAME_WINDOW = 240          # Frames kept for the rolling percentiles
+TRACE_CAPACITY = 200_000    # Trace events kept (oldest are dropped first)
+
+
+def percentile(sorted_values, q):
+    # Nearest-rank percentile of an already sorted list.
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(q / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+class Profiler:
+    """Times named phases of the game loop.
+
+    A phase is timed as ``t = profiler.begin(); ...; t = profiler.end(name, t)``;
+    ``end`` returns the current time so consecutive phases can be chained.
+    Durations are summed per frame (a phase may run once per tick or per
+    snake) and ``end_frame`` pushes the totals into a rolling window for
+    ``stats``. Every span is also kept as a trace event for
+    ``export_chrome_trace`` (load it in chrome://tracing or Perfetto).
+    """
+
+    def __init__(self, window=FRAME_WINDOW, trace_capacity=TRACE_CAPACITY):
+        self.history = deque(maxlen=window)       # per-frame {phase: seconds}
+        self.frame_ends = deque(maxlen=window)
+        self.tick_counts = deque(maxlen=window)
+        self.current = {}
+        self.ticks = 0
+        self.trace = deque(maxlen=trace_capacity)  # (phase, start, duration)
+        self.origin = time.perf_counter()
+
+    begin = staticmethod(time.perf_counter)
+
+    def end(self, phase, start):
+        now = time.perf_counter()
+        self.current[phase] = self.current.get(phase, 0.0) + (now - start)
+        self.trace.append((phase, start, now - start))
+        return now
+
+    def count_tick(self):
+        self.ticks += 1
+
+    def end_frame(self):
+        self.history.append(self.current)
+        self.frame_ends.append(time.perf_counter())
+        self.tick_counts.append(self.ticks)
+        self.current = {}
+        self.ticks = 0
+
+    # --- Summaries ---
+    def phases(self):
+        # Phase names in first-seen order.
+        names = {}
+        for frame in self.history:
+            names.update(dict.fromkeys(frame))
+        return list(names)
+
+    def ticks_per_second(self):
+        if len(self.frame_ends) < 2:
+            return 0.0
+        elapsed = self.frame_ends[-1] - self.frame_ends[0]
+        # The first frame's ticks happened before the window's start.
+        ticks = sum(self.tick_counts) - self.tick_counts[0]
+        return ticks / elapsed if elapsed > 0 else 0.0
+
+    def stats(self):
+        # phase -> (p50, p99, mean) of its per-frame total, in seconds.
+        # Frames where a phase did not run count as zero.
+        result = {}
+        for phase in self.phases():
+            values = sorted(frame.get(phase, 0.0) for frame in self.history)
+            result[phase] = (percentile(values, 50), percentile(values, 99), sum(values) / len(values))
+        return result
+
+    # --- Export ---
+    def export_json(self, path):
+        summary = {
+            'frames': len(self.history),
+            'ticks_per_second': self.ticks_per_second(),
+            'phases': {phase: {'p50_ms': p50 * 1e3, 'p99_ms': p99 * 1e3, 'mean_ms': mean * 1e3}
+                       for phase, (p50, p99, mean) in self.stats().items()},
+            'history_ms': [{phase: seconds * 1e3 for phase, seconds in frame.items()}
+                           for frame in self.history],
+        }
+        with open(path, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+    def export_chrome_trace(self, path):
+        events = [{'name': phase, 'ph': 'X', 'pid': 1, 'tid': 1,
+                   'ts': (start - self.origin) * 1e6, 'dur': duration * 1e6}
+                  for phase, start, duration in self.trace]
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+
+class NullProfiler:
+    """Stand-in used while profiling is off; every call is a no-op."""
+
+    def begin(self):
+        return 0.0
+
+    def end(self, phase, start):
+        return 0.0
+
+    def count_tick(self):
+        pass
+
+    def end_frame(self):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
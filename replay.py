@@ -0,0 +1,340 @@
+"""Compact binary match recordings with keyframe seeking.
+
+A recording is a header followed by records, each ``kind (1 byte) + payload
+length (uint32) + payload``:
+
+* ``T`` tick: the tick number, one move code per snake and the spawns that
+  happened during that tick (food, obstacles, powerups, respawns).
+* ``K`` keyframe: the full world state (including RNG state) before a tick,
+  written every ``keyframe_interval`` ticks.
+
+Replaying feeds the recorded moves and spawns back into the tick rules, so it
+does not depend on the AI or the RNG. Seeking restores the nearest keyframe
+at or before the target and replays only the ticks after it.
+"""
+import argparse
+import bisect
+import struct
+from collections import deque
+
+from world import World, DEFAULT_SNAKES, DIRECTIONS, NOT_MOVED, POWERUP_TYPES
+
+MAGIC = b"SMRP"
+VERSION = 1
+KEYFRAME_INTERVAL = 500
+
+HEADER = struct.Struct("<4sBHHHIHHHdd")
+RECORD = struct.Struct("<cI")
+TICK = struct.Struct("<I")
+COLOR = struct.Struct("<BBB")
+SPAWN = struct.Struct("<BHHHH")          # kind, x, y, a, b
+COUNT = struct.Struct("<I")
+CELL = struct.Struct("<HH")
+RNG_STATE = struct.Struct("<B625I?d")
+SNAKE = struct.Struct("<iBhhhhhBI")      # score, alive, 5 timers, direction, length
+OBSTACLE = struct.Struct("<HHH")
+POWERUP = struct.Struct("<HHHB")
+
+# Move codes: index into DIRECTIONS, or one of these.
+MOVE_TRAPPED = 4
+MOVE_DEAD = 5
+
+# Spawn kinds; a/b carry timer, powerup type, direction or snake index.
+SPAWN_FOOD = 0
+SPAWN_OBSTACLE = 1
+SPAWN_POWERUP = 2
+SPAWN_SNAKE = 3
+
+
+class ReplayError(Exception):
+    pass
+
+
+# --- Encoding ---
+def encode_move(move):
+    if move == NOT_MOVED:
+        return MOVE_DEAD
+    if move is None:
+        return MOVE_TRAPPED
+    return DIRECTIONS.index(move)
+
+
+def decode_move(code):
+    if code == MOVE_DEAD:
+        return NOT_MOVED
+    if code == MOVE_TRAPPED:
+        return None
+    return DIRECTIONS[code]
+
+
+def encode_keyframe(state):
+    version, words, gauss = state['rng']
+    parts = [TICK.pack(state['tick']),
+             RNG_STATE.pack(version, *words, gauss is not None, gauss or 0.0)]
+    for snake in state['snakes']:
+        parts.append(SNAKE.pack(snake['score'], snake['alive'], snake['respawn_timer'],
+                                snake['respawn_flash_timer'], snake['aggressive_timer'],
+                                snake['shield_timer'], snake['multiplier_timer'],
+                                DIRECTIONS.index(snake['direction']), len(snake['segments'])))
+        parts.extend(CELL.pack(*seg) for seg in snake['segments'])
+    parts.append(COUNT.pack(len(state['foods'])))
+    parts.extend(CELL.pack(*pos) for pos in state['foods'])
+    parts.append(COUNT.pack(len(state['obstacles'])))
+    parts.extend(OBSTACLE.pack(*pos, timer) for pos, timer in state['obstacles'])
+    parts.append(COUNT.pack(len(state['powerups'])))
+    parts.extend(POWERUP.pack(*pos, timer, POWERUP_TYPES.index(pu_type))
+                 for pos, timer, pu_type in state['powerups'])
+    return b"".join(parts)
+
+
+def decode_keyframe(payload, n_snakes):
+    offset = 0
+
+    def take(fmt):
+        nonlocal offset
+        values = fmt.unpack_from(payload, offset)
+        offset += fmt.size
+        return values
+
+    def take_cells(n):
+        return [take(CELL) for _ in range(n)]
+
+    tick, = take(TICK)
+    version, *words, has_gauss, gauss = take(RNG_STATE)
+    snakes = []
+    for _ in range(n_snakes):
+        score, alive, respawn, flash, aggressive, shield, multiplier, direction, length = take(SNAKE)
+        snakes.append({
+            'score': score, 'alive': bool(alive), 'respawn_timer': respawn,
+            'respawn_flash_timer': flash, 'aggressive_timer': aggressive,
+            'shield_timer': shield, 'multiplier_timer': multiplier,
+            'direction': DIRECTIONS[direction], 'segments': take_cells(length),
+        })
+    foods = take_cells(take(COUNT)[0])
+    obstacles = []
+    for _ in range(take(COUNT)[0]):
+        x, y, timer = take(OBSTACLE)
+        obstacles.append(((x, y), timer))
+    powerups = []
+    for _ in range(take(COUNT)[0]):
+        x, y, timer, pu_type = take(POWERUP)
+        powerups.append(((x, y), timer, POWERUP_TYPES[pu_type]))
+    return {
+        'tick': tick,
+        'rng': (version, tuple(words), gauss if has_gauss else None),
+        'snakes': snakes, 'foods': foods, 'obstacles': obstacles, 'powerups': powerups,
+    }
+
+
+# --- Recording ---
+class Recorder:
+    """Steps a World and appends every tick to a binary recording."""
+
+    def __init__(self, world, f, keyframe_interval=KEYFRAME_INTERVAL):
+        self.world = world
+        self.file = f
+        self.keyframe_interval = keyframe_interval
+        self.snake_index = {id(snake): i for i, snake in enumerate(world.snakes)}
+        self.spawns = []
+        world.subscribe(self.on_event)
+        f.write(HEADER.pack(MAGIC, VERSION, world.width, world.height, len(world.snakes),
+                            keyframe_interval, world.food_count, world.max_obstacles,
+                            world.max_powerups, world.obstacle_chance, world.powerup_chance))
+        for snake in world.snakes:
+            f.write(COLOR.pack(*snake.base_color))
+        # Always start with a keyframe so every recorded tick is reachable.
+        self.write_keyframe()
+
+    def on_event(self, event, snake, pos, detail):
+        if event == "spawn_food":
+            self.spawns.append((SPAWN_FOOD, *pos, 0, 0))
+        elif event == "spawn_obstacle":
+            self.spawns.append((SPAWN_OBSTACLE, *pos, detail, 0))
+        elif event == "spawn_powerup":
+            timer, pu_type = detail
+            self.spawns.append((SPAWN_POWERUP, *pos, timer, POWERUP_TYPES.index(pu_type)))
+        elif event == "spawn":
+            self.spawns.append((SPAWN_SNAKE, *pos, DIRECTIONS.index(detail), self.snake_index[id(snake)]))
+
+    def write_record(self, kind, payload):
+        self.file.write(RECORD.pack(kind, len(payload)))
+        self.file.write(payload)
+
+    def write_keyframe(self):
+        self.write_record(b"K", encode_keyframe(self.world.get_state()))
+
+    def step(self):
+        world = self.world
+        if world.tick % self.keyframe_interval == 0 and world.tick > 0:
+            self.write_keyframe()
+        tick = world.tick
+        self.spawns.clear()
+        world.step()
+        payload = [TICK.pack(tick), bytes(encode_move(move) for move in world.moves),
+                   COUNT.pack(len(self.spawns))]
+        payload.extend(SPAWN.pack(*spawn) for spawn in self.spawns)
+        self.write_record(b"T", b"".join(payload))
+
+    def close(self):
+        self.file.close()
+
+
+# --- Playback ---
+class ReplayWorld(World):
+    """A World whose moves and spawns come from a recording."""
+
+    def __init__(self, *args, **kwargs):
+        self.pending = deque()
+        self.recorded_moves = []
+        super().__init__(*args, **kwargs)
+
+    def take(self, kind):
+        if self.pending and self.pending[0][0] == kind:
+            return self.pending.popleft()
+        return None
+
+    def roll_food(self):
+        spawn = self.take(SPAWN_FOOD)
+        if spawn is None:
+            return None
+        return (spawn[1], spawn[2])
+
+    def roll_obstacle(self):
+        spawn = self.take(SPAWN_OBSTACLE)
+        if spawn is None:
+            return None
+        return (spawn[1], spawn[2]), spawn[3]
+
+    def roll_powerup(self):
+        spawn = self.take(SPAWN_POWERUP)
+        if spawn is None:
+            return None
+        return (spawn[1], spawn[2]), spawn[3], POWERUP_TYPES[spawn[4]]
+
+    def roll_respawn(self, snake):
+        spawn = self.take(SPAWN_SNAKE)
+        if spawn is None or self.snakes[spawn[4]] is not snake:
+            raise ReplayError(f"tick {self.tick}: unrecorded respawn")
+        return (spawn[1], spawn[2]), DIRECTIONS[spawn[3]]
+
+    def choose_direction(self, i, snake):
+        move = self.recorded_moves[i]
+        if move == NOT_MOVED:
+            raise ReplayError(f"tick {self.tick}: snake {i} is alive but was recorded dead")
+        return move
+
+
+class ReplayPlayer:
+    """Random access over a recording.
+
+    Opening scans record headers once to index the keyframes; ``seek(tick)``
+    then costs one keyframe decode plus the ticks since that keyframe.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        header = HEADER.unpack(self.file.read(HEADER.size))
+        magic, version, width, height, n_snakes, self.keyframe_interval, food_count, \
+            max_obstacles, max_powerups, obstacle_chance, powerup_chance = header
+        if magic != MAGIC or version != VERSION:
+            raise ReplayError(f"{path}: not a version {VERSION} recording")
+        colors = [COLOR.unpack(self.file.read(COLOR.size)) for _ in range(n_snakes)]
+        self.n_snakes = n_snakes
+        self.world = ReplayWorld(colors, width=width, height=height, food_count=food_count,
+                                 max_obstacles=max_obstacles, max_powerups=max_powerups,
+                                 obstacle_chance=obstacle_chance, powerup_chance=powerup_chance)
+        self.keyframe_ticks = []
+        self.keyframe_offsets = []
+        self.end_tick = 0
+        self.scan()
+        self.seek(self.keyframe_ticks[0])
+
+    def scan(self):
+        while True:
+            offset = self.file.tell()
+            header = self.file.read(RECORD.size)
+            if len(header) < RECORD.size:
+                break
+            kind, length = RECORD.unpack(header)
+            tick, = TICK.unpack(self.file.read(TICK.size))
+            if kind == b"K":
+                self.keyframe_ticks.append(tick)
+                self.keyframe_offsets.append(offset)
+            else:
+                self.end_tick = tick + 1
+            self.file.seek(offset + RECORD.size + length)
+        if not self.keyframe_ticks:
+            raise ReplayError("recording has no keyframe")
+
+    def read_record(self):
+        header = self.file.read(RECORD.size)
+        if len(header) < RECORD.size:
+            return None, None
+        kind, length = RECORD.unpack(header)
+        return kind, self.file.read(length)
+
+    def seek(self, tick):
+        if not self.keyframe_ticks[0] <= tick <= self.end_tick:
+            raise ReplayError(f"tick {tick} outside recording [{self.keyframe_ticks[0]}, {self.end_tick}]")
+        i = bisect.bisect_right(self.keyframe_ticks, tick) - 1
+        self.file.seek(self.keyframe_offsets[i])
+        kind, payload = self.read_record()
+        self.world.load_state(decode_keyframe(payload, self.n_snakes))
+        while self.world.tick < tick:
+            self.step()
+        return self.world
+
+    def step(self):
+        kind, payload = self.read_record()
+        while kind == b"K":
+            kind, payload = self.read_record()
+        if kind is None:
+            return False
+        tick, = TICK.unpack_from(payload)
+        if tick != self.world.tick:
+            raise ReplayError(f"expected tick {self.world.tick}, recording has {tick}")
+        moves = payload[TICK.size:TICK.size + self.n_snakes]
+        self.world.recorded_moves = [decode_move(code) for code in moves]
+        offset = TICK.size + self.n_snakes
+        n_spawns, = COUNT.unpack_from(payload, offset)
+        offset += COUNT.size
+        self.world.pending.extend(SPAWN.unpack_from(payload, offset + j * SPAWN.size)
+                                  for j in range(n_spawns))
+        self.world.step()
+        if self.world.pending:
+            raise ReplayError(f"tick {tick}: {len(self.world.pending)} recorded spawns were not replayed")
+        return True
+
+    def close(self):
+        self.file.close()
+
+
+# --- CLI ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record or inspect Snake Mayhem replays.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rec = sub.add_parser("record", help="record a headless match")
+    rec.add_argument("path")
+    rec.add_argument("--ticks", type=int, default=2000)
+    rec.add_argument("--seed", type=int, default=0)
+    rec.add_argument("--keyframe-interval", type=int, default=KEYFRAME_INTERVAL)
+    info = sub.add_parser("info", help="print scores at a tick of a recording")
+    info.add_argument("path")
+    info.add_argument("--tick", type=int, default=None, help="default: last tick")
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        world = World([color for _, color in DEFAULT_SNAKES], seed=args.seed)
+        recorder = Recorder(world, open(args.path, 'wb'), args.keyframe_interval)
+        for _ in range(args.ticks):
+            recorder.step()
+        recorder.close()
+    else:
+        player = ReplayPlayer(args.path)
+        world = player.seek(player.end_tick if args.tick is None else args.tick)
+        print(f"tick {world.tick}: scores {[snake.score for snake in world.snakes]}")
+        player.close()
+
+
+if __name__ == "__main__":
+    main()
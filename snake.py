@@ -1,581 +1,1219 @@
-import pygame
-import random
-import sys
-import numpy as np
-
-# --- Game Constants ---
-CELL_SIZE    = 20
-GRID_WIDTH   = 50
-GRID_HEIGHT  = 50
-BOARD_WIDTH  = GRID_WIDTH * CELL_SIZE      # 1000 px
-BOARD_HEIGHT = GRID_HEIGHT * CELL_SIZE     # 1000 px
-SLIDER_HEIGHT = 40                        # Extra UI space at bottom
-WINDOW_WIDTH  = BOARD_WIDTH
-WINDOW_HEIGHT = BOARD_HEIGHT + SLIDER_HEIGHT
-
-FOOD_COUNT = 5  # How many food pieces are concurrently on board
-
-# --- Colors ---
-BLACK      = (0, 0, 0)
-WHITE      = (255, 255, 255)
-RED        = (220, 20, 60)       # Crimson
-GREEN      = (50, 205, 50)       # Lime Green
-BLUE       = (65, 105, 225)      # Royal Blue
-YELLOW     = (255, 215, 0)       # Gold
-PURPLE     = (128, 0, 128)       # Aggressive powerup & snake color
-CYAN       = (0, 255, 255)       # Shield (also snake color option)
-ORANGE     = (255, 140, 0)       # Obstacles
-MAGENTA    = (255, 0, 255)       # Multiplier powerup
-DARK_GREY  = (50, 50, 50)
-
-# Background gradient colors.
-BG_TOP     = (10, 10, 30)
-BG_BOTTOM  = (30, 30, 60)
-
-# --- Initialize Pygame ---
-pygame.init()
-screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
-pygame.display.set_caption("Snake Mayhem: NPC Snakes!")
-clock = pygame.time.Clock()
-
-# --- Initialize Mixer and Create Sounds (generated on the fly) ---
-pygame.mixer.init()
-
-def create_sound(frequency=440, duration_ms=200, volume=0.5):
-    sample_rate = 44100
-    n_samples = int(sample_rate * duration_ms / 1000)
-    t = np.linspace(0, duration_ms / 1000, n_samples, endpoint=False)
-    wave = np.sin(2 * np.pi * frequency * t) * (32767 * volume)
-    wave = wave.astype(np.int16)
-    mixer_init = pygame.mixer.get_init()  # (frequency, format, channels)
-    if mixer_init is not None and mixer_init[2] == 2:
-        wave = np.column_stack((wave, wave))
-    return pygame.sndarray.make_sound(wave)
-
-sound_eat    = create_sound(frequency=600, duration_ms=150, volume=0.5)
-sound_cut    = create_sound(frequency=300, duration_ms=150, volume=0.5)
-sound_dead   = create_sound(frequency=100, duration_ms=300, volume=0.5)
-sound_boost  = create_sound(frequency=800, duration_ms=150, volume=0.5)
-
-# --- Global Effects & Screen Shake ---
-effects = []  # List to store particle effects.
-screen_shake_timer = 0
-screen_shake_intensity = 0
-
-def add_effect(board_surf, board_pos, effect_type):
-    # effect_type: "eat", "powerup", "death", "spawn"
-    if effect_type == "eat":
-        color = YELLOW
-    elif effect_type == "powerup":
-        color = MAGENTA
-    elif effect_type == "death":
-        color = RED
-    elif effect_type == "spawn":
-        color = GREEN
-    else:
-        color = WHITE
-    effect = {
-        'pos': board_pos,  # board cell (x,y) coordinate (not pixels)
-        'timer': 30,
-        'max_timer': 30,
-        'color': color,
-    }
-    effects.append(effect)
-
-def update_and_draw_effects(surface):
-    # Draw effects on the given surface (which should be the game board surface).
-    for effect in effects[:]:
-        effect['timer'] -= 1
-        if effect['timer'] <= 0:
-            effects.remove(effect)
-            continue
-        progress = 1 - effect['timer'] / effect['max_timer']
-        radius = int(5 + progress * 15)  # from 5 to 20 pixels radius
-        alpha = int(255 * (1 - progress))
-        # Create a temporary surface for the effect.
-        eff_surf = pygame.Surface((radius*2, radius*2), pygame.SRCALPHA)
-        pygame.draw.circle(eff_surf, effect['color'] + (alpha,), (radius, radius), radius)
-        # Convert board cell coordinate to pixels.
-        pos_px = (int(effect['pos'][0]*CELL_SIZE + CELL_SIZE/2 - radius),
-                  int(effect['pos'][1]*CELL_SIZE + CELL_SIZE/2 - radius))
-        surface.blit(eff_surf, pos_px)
-
-# --- Utility Functions ---
-def lerp_color(color1, color2, t):
-    return tuple(int(c1 + (c2 - c1) * t) for c1, c2 in zip(color1, color2))
-
-def get_gradient_color(base_color, index, total):
-    if total <= 1:
-        return base_color
-    factor = (index / (total - 1)) * 0.4
-    return tuple(max(0, int(c * (1 - factor))) for c in base_color)
-
-def draw_background(surface):
-    for y in range(BOARD_HEIGHT):
-        t = y / BOARD_HEIGHT
-        color = lerp_color(BG_TOP, BG_BOTTOM, t)
-        pygame.draw.line(surface, color, (0, y), (BOARD_WIDTH, y))
-    for x in range(0, BOARD_WIDTH, CELL_SIZE):
-        pygame.draw.line(surface, DARK_GREY, (x, 0), (x, BOARD_HEIGHT))
-    for y in range(0, BOARD_HEIGHT, CELL_SIZE):
-        pygame.draw.line(surface, DARK_GREY, (0, y), (BOARD_WIDTH, y))
-
-def is_in_bounds(pos):
-    return 0 <= pos[0] < GRID_WIDTH and 0 <= pos[1] < GRID_HEIGHT
-
-def collides_with_other(new_head, current_snake, snakes):
-    for snake in snakes:
-        if snake != current_snake and new_head in snake.segments:
-            return True
-    return False
-
-# --- Obstacles ---
-obstacles = []
-MAX_OBSTACLES = 10
-
-def update_obstacles():
-    for obs in obstacles[:]:
-        obs['timer'] -= 1
-        if obs['timer'] <= 0:
-            obstacles.remove(obs)
-    if len(obstacles) < MAX_OBSTACLES and random.random() < 0.02:
-        spawn_obstacle()
-
-def spawn_obstacle():
-    occupied = set()
-    for snake in snakes:
-        occupied.update(snake.segments)
-    for f in foods:
-        occupied.add(f)
-    for obs in obstacles:
-        occupied.add(obs['pos'])
-    for pu in powerups:
-        occupied.add(pu['pos'])
-    available = [(x, y) for x in range(GRID_WIDTH) for y in range(GRID_HEIGHT) if (x, y) not in occupied]
-    if available:
-        pos = random.choice(available)
-        timer = random.randint(50, 150)
-        obstacles.append({'pos': pos, 'timer': timer})
-
-def draw_obstacles(surface):
-    for obs in obstacles:
-        rect = pygame.Rect(obs['pos'][0]*CELL_SIZE, obs['pos'][1]*CELL_SIZE, CELL_SIZE, CELL_SIZE)
-        pygame.draw.rect(surface, ORANGE, rect)
-
-# --- Power-Ups ---
-powerups = []
-MAX_POWERUPS = 5
-
-def update_powerups():
-    for pu in powerups[:]:
-        pu['timer'] -= 1
-        if pu['timer'] <= 0:
-            powerups.remove(pu)
-    if len(powerups) < MAX_POWERUPS and random.random() < 0.01:
-        spawn_powerup()
-
-def spawn_powerup():
-    occupied = set()
-    for snake in snakes:
-        occupied.update(snake.segments)
-    for f in foods:
-        occupied.add(f)
-    for obs in obstacles:
-        occupied.add(obs['pos'])
-    available = [(x, y) for x in range(GRID_WIDTH) for y in range(GRID_HEIGHT) if (x, y) not in occupied]
-    if available:
-        pos = random.choice(available)
-        timer = random.randint(100, 200)
-        pu_type = random.choice(["aggressive", "shield", "multiplier"])
-        powerups.append({'pos': pos, 'timer': timer, 'type': pu_type})
-
-def draw_powerups(surface):
-    for pu in powerups:
-        rect = pygame.Rect(pu['pos'][0]*CELL_SIZE, pu['pos'][1]*CELL_SIZE, CELL_SIZE, CELL_SIZE)
-        if pu['type'] == "aggressive":
-            color = PURPLE
-        elif pu['type'] == "shield":
-            color = CYAN
-        elif pu['type'] == "multiplier":
-            color = MAGENTA
-        else:
-            color = YELLOW
-        pygame.draw.rect(surface, color, rect)
-
-# --- Food (Multiple) ---
-foods = []  # List of food coordinates
-
-def spawn_food():
-    # Spawn a food piece in a free cell.
-    occupied = set()
-    for snake in snakes:
-        occupied.update(snake.segments)
-    for f in foods:
-        occupied.add(f)
-    for obs in obstacles:
-        occupied.add(obs['pos'])
-    for pu in powerups:
-        occupied.add(pu['pos'])
-    available = [(x, y) for x in range(GRID_WIDTH) for y in range(GRID_HEIGHT) if (x, y) not in occupied]
-    if available:
-        return random.choice(available)
-    return None
-
-# --- Snake Class ---
-class Snake:
-    def __init__(self, base_color, init_pos, direction):
-        self.base_color = base_color
-        self.segments = [init_pos]
-        self.direction = direction
-        self.score = 0
-        self.alive = True
-        self.respawn_timer = 0
-        self.respawn_flash_timer = 0
-        self.aggressive_timer = 0
-        self.shield_timer = 0
-        self.multiplier_timer = 0
-
-    def head(self):
-        return self.segments[0]
-
-    def draw(self, surface):
-        total = len(self.segments)
-        for i, seg in enumerate(self.segments):
-            color = get_gradient_color(self.base_color, i, total)
-            rect = pygame.Rect(seg[0]*CELL_SIZE, seg[1]*CELL_SIZE, CELL_SIZE, CELL_SIZE)
-            pygame.draw.rect(surface, color, rect)
-        # Glowing border if power-up active or on respawn.
-        if self.aggressive_timer > 0 or self.respawn_flash_timer > 0:
-            head_rect = pygame.Rect(self.head()[0]*CELL_SIZE, self.head()[1]*CELL_SIZE, CELL_SIZE, CELL_SIZE)
-            glow_color = YELLOW if self.aggressive_timer > 0 else WHITE
-            pygame.draw.rect(surface, glow_color, head_rect, 3)
-        # Small icons above head for active power-ups.
-        font = pygame.font.SysFont(None, 16)
-        x, y = self.head()[0]*CELL_SIZE, self.head()[1]*CELL_SIZE
-        status_text = ""
-        if self.aggressive_timer > 0:
-            status_text += "A"
-        if self.shield_timer > 0:
-            status_text += "S"
-        if self.multiplier_timer > 0:
-            status_text += "M"
-        if status_text:
-            txt = font.render(status_text, True, WHITE)
-            surface.blit(txt, (x, y - 15))
-
-# --- Enhanced AI Function ---
-def get_direction_for_snake(snake, foods, powerups, snakes):
-    head = snake.head()
-    moves = [(1, 0), (-1, 0), (0, 1), (0, -1)]
-    candidate_moves = []
-    obstacle_positions = {obs['pos'] for obs in obstacles}
-    
-    for move in moves:
-        # Avoid immediate reversal.
-        if len(snake.segments) > 1:
-            if (head[0] + move[0], head[1] + move[1]) == snake.segments[1]:
-                continue
-        new_head = (head[0] + move[0], head[1] + move[1])
-        if not is_in_bounds(new_head) or new_head in obstacle_positions:
-            continue
-        
-        enemy_collision = False
-        attack_bonus = 0
-        for other in snakes:
-            if other == snake:
-                continue
-            if new_head == other.head():
-                if snake.aggressive_timer > 0 or len(snake.segments) > len(other.segments):
-                    attack_bonus = 20
-                else:
-                    enemy_collision = True
-                    break
-            elif new_head in other.segments:
-                enemy_collision = True
-                break
-        if enemy_collision:
-            continue
-        
-        # Compute cost to target: choose the closer of food vs. powerup (if no powerup active)
-        food_cost = min([abs(new_head[0]-f[0]) + abs(new_head[1]-f[1]) for f in foods]) if foods else 1000
-        if (snake.aggressive_timer == 0 and snake.shield_timer == 0 and snake.multiplier_timer == 0
-                and powerups):
-            pu_cost = min([abs(new_head[0]-pu['pos'][0]) + abs(new_head[1]-pu['pos'][1]) for pu in powerups])
-            target_cost = min(food_cost, pu_cost * 0.7)  # weight powerup distance lower
-        else:
-            target_cost = food_cost
-        
-        # Bonus for blocking enemy paths.
-        for other in snakes:
-            if other == snake:
-                continue
-            if foods:
-                enemy_to_food = abs(other.head()[0]-foods[0][0]) + abs(other.head()[1]-foods[0][1])
-                if enemy_to_food < target_cost and abs(new_head[0]-other.head()[0]) + abs(new_head[1]-other.head()[1]) == 1:
-                    target_cost -= 5
-        if new_head in snake.segments:
-            target_cost += 10
-        total_cost = target_cost - attack_bonus
-        candidate_moves.append((move, total_cost))
-    
-    if candidate_moves:
-        candidate_moves.sort(key=lambda x: x[1])
-        return candidate_moves[0][0]
-    return None
-
-# --- Slider UI Functions ---
-slider_rect = pygame.Rect(50, BOARD_HEIGHT + 10, BOARD_WIDTH - 100, 20)
-slider_handle_radius = 10
-speed_multiplier = 1
-
-def draw_slider(surface, multiplier):
-    pygame.draw.rect(surface, DARK_GREY, slider_rect)
-    pygame.draw.rect(surface, WHITE, slider_rect, 2)
-    ratio = (multiplier - 1) / 9.0
-    handle_x = slider_rect.x + int(ratio * slider_rect.width)
-    handle_y = slider_rect.y + slider_rect.height // 2
-    pygame.draw.circle(surface, YELLOW, (handle_x, handle_y), slider_handle_radius)
-    font = pygame.font.SysFont(None, 24)
-    text = font.render(f"Speed: {multiplier}x", True, WHITE)
-    surface.blit(text, (slider_rect.right + 10, slider_rect.y))
-
-def update_slider(pos):
-    global speed_multiplier
-    if slider_rect.collidepoint(pos):
-        rel = pos[0] - slider_rect.x
-        ratio = rel / slider_rect.width
-        new_mult = 1 + int(ratio * 9)
-        speed_multiplier = max(1, min(10, new_mult))
-
-# --- Respawn Function ---
-def respawn_snake(snake):
-    occupied = set()
-    for other in snakes:
-        occupied.update(other.segments)
-    for f in foods:
-        occupied.add(f)
-    for obs in obstacles:
-        occupied.add(obs['pos'])
-    for pu in powerups:
-        occupied.add(pu['pos'])
-    available = [(x, y) for x in range(GRID_WIDTH) for y in range(GRID_HEIGHT) if (x, y) not in occupied]
-    if available:
-        pos = random.choice(available)
-    else:
-        pos = (random.randint(0, GRID_WIDTH-1), random.randint(0, GRID_HEIGHT-1))
-    snake.segments = [pos]
-    snake.direction = random.choice([(1,0), (-1,0), (0,1), (0,-1)])
-    snake.alive = True
-    snake.respawn_flash_timer = 30
-    add_effect(game_board, pos, "spawn")
-
-# --- Create Game Board Surface ---
-game_board = pygame.Surface((BOARD_WIDTH, BOARD_HEIGHT))
-
-# --- Create Snakes ---
-# Define six snakes with distinct colors.
-snake_colors = [RED, GREEN, BLUE, YELLOW, PURPLE, CYAN]
-snakes = []
-for i, color in enumerate(snake_colors):
-    # Place them at random positions in the upper-left quadrant.
-    pos = (random.randint(0, GRID_WIDTH//3), random.randint(0, GRID_HEIGHT//3))
-    direction = random.choice([(1,0), (-1,0), (0,1), (0,-1)])
-    snakes.append(Snake(color, pos, direction))
-
-# --- Initialize Foods ---
-foods = []
-while len(foods) < FOOD_COUNT:
-    new_food = spawn_food()
-    if new_food is not None:
-        foods.append(new_food)
-
-# --- Header UI ---
-def draw_header(surface):
-    font_large = pygame.font.SysFont(None, 36)
-    font_small = pygame.font.SysFont(None, 24)
-    title = font_large.render("Snake Mayhem: NPC Snakes!", True, YELLOW)
-    instructions = font_small.render("Snakes chase food & powerups! And, try to kill each other.", True, WHITE)
-    surface.blit(title, ((BOARD_WIDTH - title.get_width()) // 2, 5))
-    surface.blit(instructions, ((BOARD_WIDTH - instructions.get_width()) // 2, 40))
-
-# --- Main Game Loop ---
-running = True
-while running:
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-        elif event.type == pygame.MOUSEBUTTONDOWN:
-            if event.button == 1:
-                update_slider(event.pos)
-        elif event.type == pygame.MOUSEMOTION:
-            if event.buttons[0]:
-                update_slider(event.pos)
-    
-    update_obstacles()
-    update_powerups()
-    
-    # Maintain constant food count.
-    while len(foods) < FOOD_COUNT:
-        new_food = spawn_food()
-        if new_food is not None:
-            foods.append(new_food)
-    
-    # Run game logic based on speed multiplier.
-    for _ in range(speed_multiplier):
-        for snake in snakes:
-            if snake.alive:
-                dir_choice = get_direction_for_snake(snake, foods, powerups, snakes)
-                if dir_choice is None:
-                    snake.alive = False
-                    snake.respawn_timer = 50
-                    sound_dead.play()
-                    add_effect(game_board, snake.head(), "death")
-                    screen_shake_timer = 10
-                    screen_shake_intensity = 10
-                    continue
-                new_head = (snake.head()[0] + dir_choice[0], snake.head()[1] + dir_choice[1])
-                if not is_in_bounds(new_head):
-                    snake.alive = False
-                    snake.respawn_timer = 50
-                    sound_dead.play()
-                    add_effect(game_board, snake.head(), "death")
-                    screen_shake_timer = 10
-                    screen_shake_intensity = 10
-                    continue
-                if new_head in {obs['pos'] for obs in obstacles}:
-                    snake.alive = False
-                    snake.respawn_timer = 50
-                    sound_dead.play()
-                    add_effect(game_board, snake.head(), "death")
-                    screen_shake_timer = 10
-                    screen_shake_intensity = 10
-                    continue
-                
-                # Check enemy collisions.
-                for other in snakes:
-                    if other == snake:
-                        continue
-                    if new_head == other.head():
-                        if snake.aggressive_timer > 0 or len(snake.segments) > len(other.segments):
-                            if other.shield_timer > 0:
-                                other.shield_timer = 0
-                            else:
-                                other.alive = False
-                                other.respawn_timer = 50
-                                sound_dead.play()
-                                add_effect(game_board, other.head(), "death")
-                                screen_shake_timer = 10
-                                screen_shake_intensity = 10
-                            snake.score += 2
-                        else:
-                            if snake.shield_timer > 0:
-                                snake.shield_timer = 0
-                            else:
-                                snake.alive = False
-                                snake.respawn_timer = 50
-                                sound_dead.play()
-                                add_effect(game_board, snake.head(), "death")
-                                screen_shake_timer = 10
-                                screen_shake_intensity = 10
-                            break
-                if not snake.alive:
-                    continue
-
-                snake.segments.insert(0, new_head)
-                # Check if snake eats food.
-                if new_head in foods:
-                    if snake.multiplier_timer > 0:
-                        snake.score += 2
-                    else:
-                        snake.score += 1
-                    sound_eat.play()
-                    add_effect(game_board, new_head, "eat")
-                    foods.remove(new_head)
-                else:
-                    snake.segments.pop()
-                
-                # Self-collision: cut tail.
-                if new_head in snake.segments[1:]:
-                    idx = snake.segments.index(new_head, 1)
-                    snake.segments = snake.segments[:idx]
-                    sound_cut.play()
-                
-                # Check for powerup pickup.
-                for pu in powerups[:]:
-                    if new_head == pu['pos']:
-                        if pu['type'] == "aggressive":
-                            snake.aggressive_timer = 50
-                        elif pu['type'] == "shield":
-                            snake.shield_timer = 50
-                        elif pu['type'] == "multiplier":
-                            snake.multiplier_timer = 50
-                        sound_boost.play()
-                        add_effect(game_board, new_head, "powerup")
-                        powerups.remove(pu)
-                
-                # Decrement timers.
-                if snake.aggressive_timer > 0:
-                    snake.aggressive_timer -= 1
-                if snake.shield_timer > 0:
-                    snake.shield_timer -= 1
-                if snake.multiplier_timer > 0:
-                    snake.multiplier_timer -= 1
-                if snake.respawn_flash_timer > 0:
-                    snake.respawn_flash_timer -= 1
-            else:
-                snake.respawn_timer -= 1
-                if snake.respawn_timer <= 0:
-                    respawn_snake(snake)
-    
-    # --- Drawing ---
-    # Draw game board on its own surface.
-    game_board.fill(BLACK)
-    draw_background(game_board)
-    draw_obstacles(game_board)
-    draw_powerups(game_board)
-    # Draw foods.
-    for f in foods:
-        rect = pygame.Rect(f[0]*CELL_SIZE, f[1]*CELL_SIZE, CELL_SIZE, CELL_SIZE)
-        pygame.draw.rect(game_board, WHITE, rect)
-    # Draw snakes.
-    for snake in snakes:
-        snake.draw(game_board)
-    # Draw particle effects.
-    update_and_draw_effects(game_board)
-    
-    # Screen shake: if active, choose a random offset.
-    offset_x, offset_y = 0, 0
-    if screen_shake_timer > 0:
-        offset_x = random.randint(-screen_shake_intensity, screen_shake_intensity)
-        offset_y = random.randint(-screen_shake_intensity, screen_shake_intensity)
-        screen_shake_timer -= 1
-    
-    # Blit the game board (with offset if shaking) onto the main screen.
-    screen.fill(BLACK)
-    screen.blit(game_board, (offset_x, offset_y))
-    
-    # Draw header and slider on top.
-    draw_header(screen)
-    draw_slider(screen, speed_multiplier)
-    
-    # Scoreboard.
-    font = pygame.font.SysFont(None, 24)
-    y_off = BOARD_HEIGHT - 20 if BOARD_HEIGHT < WINDOW_HEIGHT - SLIDER_HEIGHT else WINDOW_HEIGHT - 20
-    for i, snake in enumerate(snakes):
-        status = "Alive" if snake.alive else "Respawning"
-        pu_status = ""
-        if snake.aggressive_timer > 0:
-            pu_status += f" A:{snake.aggressive_timer}"
-        if snake.shield_timer > 0:
-            pu_status += f" S:{snake.shield_timer}"
-        if snake.multiplier_timer > 0:
-            pu_status += f" M:{snake.multiplier_timer}"
-        txt = font.render(f"Snake {i+1}: {snake.score} ({status}){pu_status}", True, snake.base_color)
-        screen.blit(txt, (5, y_off))
-        y_off -= 20
-
-    pygame.display.flip()
-    clock.tick(10)
-
-pygame.quit()
-sys.exit()
+import argparse
+import functools
+import importlib.util
+import math
+import os
+from collections import OrderedDict
+import random
+import sys
+import time
+import numpy as np
+
+from grid import FOOD, OBSTACLE, POWERUP
+from profiler import Profiler, NULL_PROFILER
+from world import World, GRID_WIDTH, GRID_HEIGHT, POWERUP_TYPES, scaled_world, snake_colors
+
+
+def lazy_import(name):
+    # The module only executes on first attribute access, so importing this
+    # file (or running it headless) never pays for pygame.
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    spec.loader = importlib.util.LazyLoader(spec.loader)
+    module = sys.modules[name] = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+pygame = lazy_import("pygame")
+
+# --- Game Constants ---
+CELL_SIZE    = 20
+BOARD_WIDTH  = GRID_WIDTH * CELL_SIZE      # 1000 px
+BOARD_HEIGHT = GRID_HEIGHT * CELL_SIZE     # 1000 px
+SLIDER_HEIGHT = 40                        # Extra UI space at bottom
+WINDOW_WIDTH  = BOARD_WIDTH
+WINDOW_HEIGHT = BOARD_HEIGHT + SLIDER_HEIGHT
+
+# --- World Size ---
+# Defaults for --width/--height/--snakes. A world bigger than the board area
+# switches to large-world mode: a scrollable (arrow keys / right-drag) and
+# zoomable (mouse wheel) camera over chunked board surfaces, with food and
+# item caps scaled to the snake count.
+WORLD_WIDTH  = GRID_WIDTH
+WORLD_HEIGHT = GRID_HEIGHT
+SNAKE_COUNT  = 6
+HEADLESS_TICKS = 2000           # Default --ticks for --headless runs
+
+# --- Timing ---
+# The simulation runs on a fixed timestep of BASE_TICK_HZ * speed ticks per
+# second, independent of the render rate; at SPEED_MAX it runs as many ticks
+# as fit in each frame.
+RENDER_FPS   = 60
+BASE_TICK_HZ = 10
+SPEED_MAX    = 11               # Slider position past 10x: as fast as possible
+MAX_TICKS_PER_FRAME = 100       # Drop backlog beyond this instead of spiralling
+SIM_FRAME_BUDGET = 0.8          # Share of a frame spent simulating at SPEED_MAX
+
+# --- Colors ---
+BLACK      = (0, 0, 0)
+WHITE      = (255, 255, 255)
+RED        = (220, 20, 60)       # Crimson
+GREEN      = (50, 205, 50)       # Lime Green
+BLUE       = (65, 105, 225)      # Royal Blue
+YELLOW     = (255, 215, 0)       # Gold
+PURPLE     = (128, 0, 128)       # Aggressive powerup & snake color
+CYAN       = (0, 255, 255)       # Shield (also snake color option)
+ORANGE     = (255, 140, 0)       # Obstacles
+MAGENTA    = (255, 0, 255)       # Multiplier powerup
+DARK_GREY  = (50, 50, 50)
+
+# Background gradient colors.
+BG_TOP     = (10, 10, 30)
+BG_BOTTOM  = (30, 30, 60)
+
+# --- Display ---
+def init_display():
+    # Only the display and font subsystems; the mixer starts with the first
+    # sound played.
+    pygame.display.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+    pygame.display.set_caption("Snake Mayhem: NPC Snakes!")
+    return screen
+
+def shutdown():
+    # Fonts and sounds die with pygame; drop them so a later init starts clean.
+    fonts.clear()
+    render_text.cache_clear()
+    audio.close()
+    pygame.quit()
+
+# --- Sounds ---
+# Tones are synthesized once and kept on disk as raw 16-bit mono PCM; the
+# mixer is initialized and the sounds loaded by AudioDispatcher.
+SAMPLE_RATE = 44100
+SOUND_CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+                               "snake-mayhem", "sounds")
+
+def tone_samples(frequency, duration_ms, volume):
+    n_samples = int(SAMPLE_RATE * duration_ms / 1000)
+    t = np.linspace(0, duration_ms / 1000, n_samples, endpoint=False)
+    wave = np.sin(2 * np.pi * frequency * t) * (32767 * volume)
+    return wave.astype(np.int16)
+
+def load_tone(frequency, duration_ms, volume):
+    path = os.path.join(SOUND_CACHE_DIR, f"tone_{frequency}_{duration_ms}_{volume}_{SAMPLE_RATE}.pcm")
+    try:
+        return np.fromfile(path, dtype="<i2")
+    except OSError:
+        pass
+    wave = tone_samples(frequency, duration_ms, volume)
+    try:
+        os.makedirs(SOUND_CACHE_DIR, exist_ok=True)
+        # Parallel games may race on the cache: write aside, then rename.
+        tmp = f"{path}.{os.getpid()}.tmp"
+        wave.astype("<i2").tofile(tmp)
+        os.replace(tmp, path)
+    except OSError:
+        pass          # An unwritable cache only costs the synthesis next time
+    return wave
+
+def create_sound(frequency=440, duration_ms=200, volume=0.5):
+    wave = load_tone(frequency, duration_ms, volume)
+    mixer_init = pygame.mixer.get_init()  # (frequency, format, channels)
+    if mixer_init is not None and mixer_init[2] == 2:
+        wave = np.column_stack((wave, wave))
+    return pygame.sndarray.make_sound(wave)
+
+# event -> (frequency, duration ms, volume); full scale, the channel volume
+# below sets how loud each play is.
+EVENT_TONES = {
+    "eat":     (600, 150, 1.0),
+    "cut":     (300, 150, 1.0),
+    "death":   (100, 300, 1.0),
+    "powerup": (800, 150, 1.0),
+}
+SOUND_BASE_VOLUME = 0.5      # Channel volume for a single event
+SOUND_BURST_STEP = 0.125     # Added per doubling of the events merged into one play, up to 1.0
+
+class AudioDispatcher:
+    """Coalesces sound events between rendered frames onto reserved channels.
+
+    ``queue`` only counts events, so the simulation ticks never touch the
+    mixer. ``flush``, once per rendered frame, plays each sound that fired
+    at most once on its own reserved channel (restarting it if still
+    playing). A single event plays at SOUND_BASE_VOLUME, and a burst merged
+    into one play gets louder with the log of its event count, up to full
+    volume. The mixer is initialized and the sounds loaded on the first
+    flush with anything to play.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled        # Cleared by --mute or when there is no audio device
+        self.counts = dict.fromkeys(EVENT_TONES, 0)
+        self.pending = False
+        self.channels = None          # event -> (reserved Channel, Sound)
+
+    def queue(self, event):
+        if self.enabled and event in self.counts:
+            self.counts[event] += 1
+            self.pending = True
+
+    def flush(self):
+        if not self.pending:
+            return
+        self.pending = False
+        if self.channels is None and not self.open():
+            return
+        counts = self.counts
+        for event, count in counts.items():
+            if count:
+                channel, sound = self.channels[event]
+                channel.set_volume(min(1.0, SOUND_BASE_VOLUME + SOUND_BURST_STEP * math.log2(count)))
+                channel.play(sound)
+                counts[event] = 0
+
+    def open(self):
+        try:
+            pygame.mixer.init()
+        except pygame.error:
+            self.enabled = False
+            return False
+        # Reserved channels are never picked for other sounds, so a burst
+        # can neither steal them nor spill over into more channels.
+        n = len(EVENT_TONES)
+        if pygame.mixer.get_num_channels() < n:
+            pygame.mixer.set_num_channels(n)
+        pygame.mixer.set_reserved(n)
+        self.channels = {event: (pygame.mixer.Channel(i), create_sound(*tone))
+                         for i, (event, tone) in enumerate(EVENT_TONES.items())}
+        return True
+
+    def close(self):
+        self.channels = None
+        self.pending = False
+        for event in self.counts:
+            self.counts[event] = 0
+
+audio = AudioDispatcher()
+
+# --- Global Effects & Screen Shake ---
+EFFECT_CAPACITY = 256
+EFFECT_FRAMES = 3 * RENDER_FPS
+EFFECT_COLORS = {
+    "eat": YELLOW,
+    "powerup": MAGENTA,
+    "death": RED,
+    "spawn": GREEN,
+}
+screen_shake_timer = 0
+screen_shake_intensity = 0
+
+class EffectPool:
+    """Fixed-capacity particle effects stored in parallel preallocated lists.
+
+    Expired effects are swap-removed with the last live slot, and each
+    (color, remaining frames) circle is rendered once into a cached alpha
+    sprite, so drawing an effect is a single blit with no allocation.
+    """
+
+    def __init__(self, capacity=EFFECT_CAPACITY):
+        self.capacity = capacity
+        self.xs = [0] * capacity      # board cell coordinates (not pixels)
+        self.ys = [0] * capacity
+        self.timers = [0] * capacity
+        self.colors = [WHITE] * capacity
+        self.count = 0
+        self.sprites = {}
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.count = 0
+
+    def add(self, board_pos, color):
+        i = self.count
+        if i == self.capacity:
+            # Pool full: recycle the oldest effect.
+            i = min(range(self.count), key=self.timers.__getitem__)
+        else:
+            self.count += 1
+        self.xs[i], self.ys[i] = board_pos
+        self.timers[i] = EFFECT_FRAMES
+        self.colors[i] = color
+
+    def sprite(self, color, timer):
+        key = (color, timer)
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            progress = 1 - timer / EFFECT_FRAMES
+            radius = int(5 + progress * 15)  # from 5 to 20 pixels radius
+            alpha = int(255 * (1 - progress))
+            surf = pygame.Surface((radius*2, radius*2), pygame.SRCALPHA)
+            pygame.draw.circle(surf, color + (alpha,), (radius, radius), radius)
+            sprite = self.sprites[key] = (surf, radius)
+        return sprite
+
+    def update_and_draw(self, surface, view=None):
+        # view is (left cell, top cell, cell size) for a camera; effects
+        # falling outside the surface are updated but not drawn.
+        left, top, cell_size = view if view is not None else (0, 0, CELL_SIZE)
+        width, height = surface.get_size()
+        drawn = []
+        xs, ys, timers, colors = self.xs, self.ys, self.timers, self.colors
+        i = 0
+        while i < self.count:
+            timers[i] -= 1
+            if timers[i] <= 0:
+                last = self.count - 1
+                xs[i], ys[i], timers[i], colors[i] = xs[last], ys[last], timers[last], colors[last]
+                self.count = last
+                # The swapped-in effect has not been updated yet this frame.
+                continue
+            surf, radius = self.sprite(colors[i], timers[i])
+            x = int((xs[i] - left)*cell_size + cell_size/2 - radius)
+            y = int((ys[i] - top)*cell_size + cell_size/2 - radius)
+            if -2*radius < x < width and -2*radius < y < height:
+                drawn.append(surface.blit(surf, (x, y)))
+            i += 1
+        return drawn
+
+effects = EffectPool()
+
+def add_effect(board_pos, effect_type):
+    # effect_type: "eat", "powerup", "death", "spawn"
+    effects.add(board_pos, EFFECT_COLORS.get(effect_type, WHITE))
+
+def update_and_draw_effects(surface):
+    # Draw effects on the given surface (which should be the game board surface).
+    # Returns the rects drawn so the renderer can restore them next frame.
+    return effects.update_and_draw(surface)
+
+# --- World Event Hooks (sound, effects, screen shake) ---
+def on_world_event(event, snake, pos, detail):
+    global screen_shake_timer, screen_shake_intensity
+    audio.queue(event)
+    if event in EFFECT_COLORS:
+        add_effect(pos, event)
+    if event == "death":
+        screen_shake_timer = RENDER_FPS
+        screen_shake_intensity = 10
+
+# --- Fonts & Text Cache ---
+# SysFont resolution is slow, so each size is looked up once; rendered text
+# surfaces are cached by (text, size, color) and must only be blitted.
+FONT_SMALL = 16
+FONT_MEDIUM = 24
+FONT_LARGE = 36
+TEXT_CACHE_SIZE = 512
+
+fonts = {}
+
+def get_font(size):
+    font = fonts.get(size)
+    if font is None:
+        if not pygame.font.get_init():
+            pygame.font.init()
+        font = fonts[size] = pygame.font.SysFont(None, size)
+    return font
+
+@functools.lru_cache(maxsize=TEXT_CACHE_SIZE)
+def render_text(text, size, color):
+    return get_font(size).render(text, True, color)
+
+# --- Utility Functions ---
+def lerp_color(color1, color2, t):
+    return tuple(int(c1 + (c2 - c1) * t) for c1, c2 in zip(color1, color2))
+
+def get_gradient_color(base_color, index, total):
+    if total <= 1:
+        return base_color
+    factor = (index / (total - 1)) * 0.4
+    return tuple(max(0, int(c * (1 - factor))) for c in base_color)
+
+def draw_background(surface):
+    for y in range(BOARD_HEIGHT):
+        t = y / BOARD_HEIGHT
+        color = lerp_color(BG_TOP, BG_BOTTOM, t)
+        pygame.draw.line(surface, color, (0, y), (BOARD_WIDTH, y))
+    for x in range(0, BOARD_WIDTH, CELL_SIZE):
+        pygame.draw.line(surface, DARK_GREY, (x, 0), (x, BOARD_HEIGHT))
+    for y in range(0, BOARD_HEIGHT, CELL_SIZE):
+        pygame.draw.line(surface, DARK_GREY, (0, y), (BOARD_WIDTH, y))
+
+# --- Obstacles ---
+def draw_obstacles(surface, obstacles):
+    for obs in obstacles:
+        rect = pygame.Rect(obs['pos'][0]*CELL_SIZE, obs['pos'][1]*CELL_SIZE, CELL_SIZE, CELL_SIZE)
+        pygame.draw.rect(surface, ORANGE, rect)
+
+# --- Power-Ups ---
+def powerup_color(pu_type):
+    if pu_type == "aggressive":
+        return PURPLE
+    elif pu_type == "shield":
+        return CYAN
+    elif pu_type == "multiplier":
+        return MAGENTA
+    return YELLOW
+
+def draw_powerups(surface, powerups):
+    for pu in powerups:
+        rect = pygame.Rect(pu['pos'][0]*CELL_SIZE, pu['pos'][1]*CELL_SIZE, CELL_SIZE, CELL_SIZE)
+        pygame.draw.rect(surface, powerup_color(pu['type']), rect)
+
+# --- Food (Multiple) ---
+def draw_foods(surface, foods):
+    for f in foods:
+        rect = pygame.Rect(f[0]*CELL_SIZE, f[1]*CELL_SIZE, CELL_SIZE, CELL_SIZE)
+        pygame.draw.rect(surface, WHITE, rect)
+
+# --- Snake Drawing ---
+def snake_glow_color(snake):
+    # Glowing border if power-up active or on respawn.
+    if snake.aggressive_timer > 0:
+        return YELLOW
+    if snake.respawn_flash_timer > 0:
+        return WHITE
+    return None
+
+def draw_snake(surface, snake):
+    total = len(snake.segments)
+    for i, seg in enumerate(snake.segments):
+        color = get_gradient_color(snake.base_color, i, total)
+        rect = pygame.Rect(seg[0]*CELL_SIZE, seg[1]*CELL_SIZE, CELL_SIZE, CELL_SIZE)
+        pygame.draw.rect(surface, color, rect)
+    glow_color = snake_glow_color(snake)
+    if glow_color is not None:
+        head_rect = pygame.Rect(snake.head()[0]*CELL_SIZE, snake.head()[1]*CELL_SIZE, CELL_SIZE, CELL_SIZE)
+        pygame.draw.rect(surface, glow_color, head_rect, 3)
+
+def draw_snake_status(surface, snake, head_px=None):
+    # Small icons above head for active power-ups; returns the drawn rect.
+    if head_px is None:
+        head_px = (snake.head()[0]*CELL_SIZE, snake.head()[1]*CELL_SIZE)
+    x, y = head_px
+    status_text = ""
+    if snake.aggressive_timer > 0:
+        status_text += "A"
+    if snake.shield_timer > 0:
+        status_text += "S"
+    if snake.multiplier_timer > 0:
+        status_text += "M"
+    if status_text:
+        txt = render_text(status_text, FONT_SMALL, WHITE)
+        return surface.blit(txt, (x, y - 15))
+    return None
+
+# --- Dirty-Rect Board Renderer ---
+def cell_rect(pos):
+    return pygame.Rect(pos[0]*CELL_SIZE, pos[1]*CELL_SIZE, CELL_SIZE, CELL_SIZE)
+
+class BoardRenderer:
+    """Keeps the game board surface up to date by redrawing only what changed.
+
+    Each frame the board is reduced to a cell -> (fill color, glow color) map
+    in draw order; cells whose entry changed since the last frame, plus cells
+    under last frame's overlays (effects, status icons, sliding heads), are
+    restored from the cached background and repainted. ``render`` returns the
+    touched rects.
+
+    Given the heads from before the last tick and the fraction ``alpha`` of
+    the next tick already elapsed, heads that moved one cell are drawn as
+    overlays slid part-way from their previous cell.
+    """
+
+    def __init__(self, board_surface):
+        self.board = board_surface
+        self.background = pygame.Surface(board_surface.get_size())
+        draw_background(self.background)
+        self.cells = {}
+        self.overlays = []
+        self.full = True
+        self.flat_background = False
+
+    def invalidate(self):
+        self.full = True
+
+    def set_flat_background(self, flat):
+        # A solid BG_TOP fill instead of the gradient and grid lines.
+        self.flat_background = flat
+        self.invalidate()
+
+    def clear_rect(self, rect):
+        if self.flat_background:
+            self.board.fill(BG_TOP, rect)
+        else:
+            self.board.blit(self.background, rect, rect)
+
+    def cell_contents(self, world, sliding=()):
+        cells = {}
+        for obs in world.obstacles.values():
+            cells[obs['pos']] = (ORANGE, None)
+        for pu in world.powerups.values():
+            cells[pu['pos']] = (powerup_color(pu['type']), None)
+        for f in world.foods:
+            cells[f] = (WHITE, None)
+        for snake in world.snakes:
+            total = len(snake.segments)
+            slides = snake in sliding
+            for i, seg in enumerate(snake.segments):
+                if i == 0 and slides:
+                    continue
+                cells[seg] = (get_gradient_color(snake.base_color, i, total), None)
+            glow_color = snake_glow_color(snake)
+            if glow_color is not None and not slides:
+                cells[snake.head()] = (cells[snake.head()][0], glow_color)
+        return cells
+
+    def sliding_heads(self, world, prev_heads, alpha):
+        # snake -> interpolated head position in pixels.
+        sliding = {}
+        if prev_heads is None or alpha >= 1:
+            return sliding
+        for snake, prev in zip(world.snakes, prev_heads):
+            head = snake.head()
+            if snake.alive and abs(head[0] - prev[0]) + abs(head[1] - prev[1]) == 1:
+                sliding[snake] = (int((prev[0] + (head[0] - prev[0]) * alpha) * CELL_SIZE),
+                                  int((prev[1] + (head[1] - prev[1]) * alpha) * CELL_SIZE))
+        return sliding
+
+    def paint_cell(self, pos, content):
+        rect = cell_rect(pos)
+        self.clear_rect(rect)
+        if content is not None:
+            pygame.draw.rect(self.board, content[0], rect)
+            if content[1] is not None:
+                pygame.draw.rect(self.board, content[1], rect, 3)
+        return rect
+
+    def cells_under(self, rect):
+        rect = rect.clip(self.board.get_rect())
+        for x in range(rect.left // CELL_SIZE, (rect.right - 1) // CELL_SIZE + 1):
+            for y in range(rect.top // CELL_SIZE, (rect.bottom - 1) // CELL_SIZE + 1):
+                yield (x, y)
+
+    def render(self, world, prev_heads=None, alpha=1.0):
+        sliding = self.sliding_heads(world, prev_heads, alpha)
+        cells = self.cell_contents(world, sliding)
+        if self.full:
+            self.clear_rect(self.board.get_rect())
+            draw_obstacles(self.board, world.obstacles.values())
+            draw_powerups(self.board, world.powerups.values())
+            draw_foods(self.board, world.foods)
+            for snake in world.snakes:
+                draw_snake(self.board, snake)
+            for snake in sliding:
+                self.paint_cell(snake.head(), cells.get(snake.head()))
+            dirty = [self.board.get_rect()]
+            self.full = False
+        else:
+            changed = {pos for pos in cells.keys() | self.cells.keys()
+                       if cells.get(pos) != self.cells.get(pos)}
+            for rect in self.overlays:
+                changed.update(self.cells_under(rect))
+            dirty = [self.paint_cell(pos, cells.get(pos)) for pos in changed]
+        self.cells = cells
+
+        # Overlays are drawn over the repainted cells each frame.
+        overlays = []
+        for snake, (x, y) in sliding.items():
+            rect = pygame.Rect(x, y, CELL_SIZE, CELL_SIZE)
+            pygame.draw.rect(self.board, snake.base_color, rect)
+            glow_color = snake_glow_color(snake)
+            if glow_color is not None:
+                pygame.draw.rect(self.board, glow_color, rect, 3)
+            overlays.append(rect.clip(self.board.get_rect()))
+        for snake in world.snakes:
+            rect = draw_snake_status(self.board, snake, sliding.get(snake))
+            if rect is not None:
+                overlays.append(rect)
+        overlays.extend(update_and_draw_effects(self.board))
+        dirty.extend(overlays)
+        self.overlays = overlays
+        return dirty
+
+# --- Raster Board Renderer ---
+GRADIENT_SHADES = 32         # Body shades per snake color in the raster palette
+
+@functools.lru_cache(maxsize=1024)
+def gradient_shades(length):
+    # Palette shade of each segment of a snake this long; with
+    # get_gradient_color's 0-40% darkening split into GRADIENT_SHADES steps.
+    if length <= 1:
+        return np.zeros(length, dtype=np.int32)
+    return np.rint(np.arange(length) * ((GRADIENT_SHADES - 1) / (length - 1))).astype(np.int32)
+
+class RasterBoardRenderer(BoardRenderer):
+    """Draws the whole board from a per-cell color index grid.
+
+    Items and snake bodies are written as palette indices into a cells
+    array (0 = background), expanded to pixel blocks over the cached
+    background with one vectorized assignment and put on the board with a
+    single blit, so no draw call is made per segment or item and the frame
+    cost is bounded by the board size.
+    Body gradients come from GRADIENT_SHADES palette entries per snake.
+    Head glows, sliding heads, status icons and effects are drawn on top
+    per snake, as in BoardRenderer. ``render`` always returns the whole
+    board.
+    """
+
+    ITEM_SLOTS = {FOOD: 1, OBSTACLE: 2}     # palette slots; powerups follow
+
+    def __init__(self, board_surface):
+        super().__init__(board_surface)
+        self.background_pixels = np.ascontiguousarray(pygame.surfarray.array2d(self.background))
+        self.frame = np.empty_like(self.background_pixels)
+        width, height = board_surface.get_size()
+        self.cells = np.zeros((width // CELL_SIZE, height // CELL_SIZE), dtype=np.int32)
+        self.item_index = np.zeros(max(FOOD, OBSTACLE, POWERUP) + 1, dtype=np.int32)
+        for kind, slot in self.ITEM_SLOTS.items():
+            self.item_index[kind] = slot
+        self.powerup_slot = {pu_type: 3 + i for i, pu_type in enumerate(POWERUP_TYPES)}
+        self.snake_base = 3 + len(POWERUP_TYPES)
+        self.palette = None
+        self.colors = None
+
+    def build_palette(self, snakes):
+        colors = [BLACK, WHITE, ORANGE] + [powerup_color(pu_type) for pu_type in POWERUP_TYPES]
+        for snake in snakes:
+            colors.extend(lerp_color(snake.base_color, (0, 0, 0), 0.4 * shade / (GRADIENT_SHADES - 1))
+                          for shade in range(GRADIENT_SHADES))
+        # Mapped pixel values, so frames are built as whole 32-bit pixels.
+        self.palette = np.array([self.background.map_rgb(color) for color in colors],
+                                dtype=self.background_pixels.dtype)
+        self.colors = [snake.base_color for snake in snakes]
+
+    def render(self, world, prev_heads=None, alpha=1.0):
+        if self.colors != [snake.base_color for snake in world.snakes]:
+            self.build_palette(world.snakes)
+        sliding = self.sliding_heads(world, prev_heads, alpha)
+
+        # Cell colors, in BoardRenderer's draw order.
+        cells = self.cells
+        cells.fill(0)
+        view = cells[:world.width, :world.height]
+        np.take(self.item_index, world.grid.items, out=view)
+        for pu in world.powerups.values():
+            view[pu['pos']] = self.powerup_slot.get(pu['type'], 0)
+        for i, snake in enumerate(world.snakes):
+            segments = snake.segments.order
+            base = self.snake_base + i * GRADIENT_SHADES
+            shades = gradient_shades(len(segments))
+            if snake in sliding:
+                segments, shades = list(segments)[1:], shades[1:]
+            if not segments:
+                continue
+            xy = np.array(segments, dtype=np.int32)
+            view[xy[:, 0], xy[:, 1]] = base + shades
+
+        # Cell -> pixel block upscale over the background, then one blit.
+        # blocks[x, y] is the CELL_SIZE square of pixels of cell (x, y).
+        w, h = cells.shape
+        frame = self.frame
+        if self.flat_background:
+            frame.fill(self.background.map_rgb(BG_TOP))
+        else:
+            np.copyto(frame, self.background_pixels)
+        blocks = frame.reshape(w, CELL_SIZE, h, CELL_SIZE).transpose(0, 2, 1, 3)
+        xs, ys = np.nonzero(cells)
+        blocks[xs, ys] = self.palette[cells[xs, ys]][:, None, None]
+        pygame.surfarray.blit_array(self.board, frame)
+
+        # Overlays in BoardRenderer's order: head glows (only where no later
+        # snake's body covers the head), sliding heads, then status icons.
+        for i, snake in enumerate(world.snakes):
+            glow_color = snake_glow_color(snake)
+            if glow_color is not None and snake not in sliding:
+                base = self.snake_base + i * GRADIENT_SHADES
+                if base <= view[snake.head()] < base + GRADIENT_SHADES:
+                    pygame.draw.rect(self.board, glow_color, cell_rect(snake.head()), 3)
+        for snake, (x, y) in sliding.items():
+            rect = pygame.Rect(x, y, CELL_SIZE, CELL_SIZE)
+            pygame.draw.rect(self.board, snake.base_color, rect)
+            glow_color = snake_glow_color(snake)
+            if glow_color is not None:
+                pygame.draw.rect(self.board, glow_color, rect, 3)
+        for snake in world.snakes:
+            draw_snake_status(self.board, snake, sliding.get(snake))
+        update_and_draw_effects(self.board)
+        return [self.board.get_rect()]
+
+# --- Large-World Camera & Chunked Renderer ---
+CHUNK_CELLS = 32             # Chunk side, in cells
+CHUNK_CACHE_BYTES = 64 << 20 # Chunk pixel memory kept around (LRU), beyond what is in view
+MIN_CAMERA_CELL = 2          # Zoom limits, in pixels per cell
+MAX_CAMERA_CELL = 40
+GRID_LINE_MIN_CELL = 8       # Below this zoom grid lines are left out
+STATUS_MIN_CELL = 12         # ... and so are the snake status icons
+PAN_SPEED = 20               # Pixels per frame while an arrow key is held
+
+def surface_bytes(surface):
+    return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+class Camera:
+    """Scrollable, zoomable view onto a world larger than the board area."""
+
+    def __init__(self, width, height, world_width, world_height, cell_size=CELL_SIZE):
+        self.width = width                # view size in pixels
+        self.height = height
+        self.world_width = world_width    # world size in cells
+        self.world_height = world_height
+        self.cell_size = cell_size
+        self.left = 0.0                   # top-left corner of the view, in cells
+        self.top = 0.0
+
+    def clamp(self):
+        max_left = max(0.0, self.world_width - self.width / self.cell_size)
+        max_top = max(0.0, self.world_height - self.height / self.cell_size)
+        self.left = min(max(self.left, 0.0), max_left)
+        self.top = min(max(self.top, 0.0), max_top)
+
+    def pan(self, dx, dy):
+        self.left += dx / self.cell_size
+        self.top += dy / self.cell_size
+        self.clamp()
+
+    def zoom_at(self, screen_pos, steps):
+        # Keep the cell under screen_pos in place while zooming.
+        cell_x = self.left + screen_pos[0] / self.cell_size
+        cell_y = self.top + screen_pos[1] / self.cell_size
+        new_size = int(round(self.cell_size * 1.25 ** steps))
+        if new_size == self.cell_size:
+            new_size += 1 if steps > 0 else -1
+        self.cell_size = max(MIN_CAMERA_CELL, min(MAX_CAMERA_CELL, new_size))
+        self.left = cell_x - screen_pos[0] / self.cell_size
+        self.top = cell_y - screen_pos[1] / self.cell_size
+        self.clamp()
+
+    def visible_cells(self):
+        # (x0, y0, x1, y1), end-exclusive.
+        x0, y0 = int(self.left), int(self.top)
+        x1 = min(self.world_width, int(self.left + self.width / self.cell_size) + 1)
+        y1 = min(self.world_height, int(self.top + self.height / self.cell_size) + 1)
+        return x0, y0, x1, y1
+
+    def cell_to_screen(self, x, y):
+        return (int((x - self.left) * self.cell_size), int((y - self.top) * self.cell_size))
+
+class ChunkedBoardRenderer:
+    """Board renderer for large worlds, drawn through a Camera.
+
+    The background and items are baked into CHUNK_CELLS-square surfaces that
+    are only rebuilt when an item event touches the chunk (or the zoom
+    changes). Only chunks in view are drawn, and snakes and effects outside
+    the view are skipped, so frame cost follows what is visible.
+    """
+
+    ITEM_EVENTS = {"spawn_food", "spawn_obstacle", "spawn_powerup", "expire_obstacle",
+                   "expire_powerup", "eat", "powerup"}
+
+    def __init__(self, board_surface, world, camera):
+        self.board = board_surface
+        self.world = world
+        self.camera = camera
+        self.chunks = OrderedDict()   # (chunk x, chunk y) -> surface at self.cell_size
+        self.chunk_bytes = 0          # Pixel memory held by self.chunks
+        self.cell_size = None
+        self.dirty = set()
+        self.flat_background = False
+        world.subscribe(self.on_world_event)
+
+    def on_world_event(self, event, snake, pos, detail):
+        if event in self.ITEM_EVENTS:
+            self.dirty.add((pos[0] // CHUNK_CELLS, pos[1] // CHUNK_CELLS))
+
+    def invalidate(self):
+        self.chunks.clear()
+        self.chunk_bytes = 0
+
+    def set_flat_background(self, flat):
+        self.flat_background = flat
+        self.invalidate()
+
+    def drop_chunk(self, key):
+        chunk = self.chunks.pop(key, None)
+        if chunk is not None:
+            self.chunk_bytes -= surface_bytes(chunk)
+
+    def build_chunk(self, cx, cy, powerup_types):
+        world, cs = self.world, self.cell_size
+        x0, y0 = cx * CHUNK_CELLS, cy * CHUNK_CELLS
+        w = min(CHUNK_CELLS, world.width - x0)
+        h = min(CHUNK_CELLS, world.height - y0)
+        surf = pygame.Surface((w * cs, h * cs))
+        if self.flat_background:
+            surf.fill(BG_TOP)
+        else:
+            for row in range(h):
+                color = lerp_color(BG_TOP, BG_BOTTOM, (y0 + row) / world.height)
+                surf.fill(color, (0, row * cs, w * cs, cs))
+        if cs >= GRID_LINE_MIN_CELL and not self.flat_background:
+            for x in range(0, w * cs, cs):
+                pygame.draw.line(surf, DARK_GREY, (x, 0), (x, h * cs))
+            for y in range(0, h * cs, cs):
+                pygame.draw.line(surf, DARK_GREY, (0, y), (w * cs, y))
+        items = world.grid.items[x0:x0 + w, y0:y0 + h]
+        for x, y in zip(*np.nonzero(items)):
+            kind = items[x, y]
+            if kind == FOOD:
+                color = WHITE
+            elif kind == OBSTACLE:
+                color = ORANGE
+            else:
+                color = powerup_color(powerup_types.get((x0 + x, y0 + y)))
+            surf.fill(color, (x * cs, y * cs, cs, cs))
+        return surf
+
+    def render(self, world, prev_heads=None, alpha=1.0):
+        camera, board = self.camera, self.board
+        if camera.cell_size != self.cell_size:
+            self.invalidate()
+            self.cell_size = camera.cell_size
+        for key in self.dirty:
+            self.drop_chunk(key)
+        self.dirty.clear()
+        cs = self.cell_size
+
+        board.fill(BLACK)
+        x0, y0, x1, y1 = camera.visible_cells()
+        powerup_types = None
+        visible_bytes = 0
+        for cy in range(y0 // CHUNK_CELLS, (y1 - 1) // CHUNK_CELLS + 1):
+            for cx in range(x0 // CHUNK_CELLS, (x1 - 1) // CHUNK_CELLS + 1):
+                key = (cx, cy)
+                chunk = self.chunks.get(key)
+                if chunk is None:
+                    if powerup_types is None:
+                        powerup_types = {pos: pu['type'] for pos, pu in world.powerups.items()}
+                    chunk = self.chunks[key] = self.build_chunk(cx, cy, powerup_types)
+                    self.chunk_bytes += surface_bytes(chunk)
+                else:
+                    self.chunks.move_to_end(key)
+                visible_bytes += surface_bytes(chunk)
+                board.blit(chunk, camera.cell_to_screen(cx * CHUNK_CELLS, cy * CHUNK_CELLS))
+        # Chunk size grows with the square of the zoom, so the cache is
+        # bounded by memory; chunks in view are the newest and never evicted.
+        while self.chunk_bytes > max(CHUNK_CACHE_BYTES, visible_bytes):
+            self.drop_chunk(next(iter(self.chunks)))
+
+        for snake in world.snakes:
+            # Every segment lies within len(segments) cells of the head.
+            (hx, hy), n = snake.head(), len(snake.segments)
+            if hx + n < x0 or hx - n >= x1 or hy + n < y0 or hy - n >= y1:
+                continue
+            for i, seg in enumerate(snake.segments):
+                if x0 <= seg[0] < x1 and y0 <= seg[1] < y1:
+                    board.fill(get_gradient_color(snake.base_color, i, n),
+                               (*camera.cell_to_screen(*seg), cs, cs))
+            if x0 <= hx < x1 and y0 <= hy < y1:
+                head_px = camera.cell_to_screen(hx, hy)
+                glow_color = snake_glow_color(snake)
+                if glow_color is not None:
+                    pygame.draw.rect(board, glow_color, (*head_px, cs, cs), max(1, 3 * cs // CELL_SIZE))
+                if cs >= STATUS_MIN_CELL:
+                    draw_snake_status(board, snake, head_px)
+        effects.update_and_draw(board, (camera.left, camera.top, cs))
+        return [board.get_rect()]
+
+# --- Slider UI Functions ---
+SLIDER_RECT = (50, BOARD_HEIGHT + 10, BOARD_WIDTH - 100, 20)
+slider_handle_radius = 10
+speed_multiplier = 1
+
+def draw_slider(surface, multiplier):
+    slider_rect = pygame.Rect(SLIDER_RECT)
+    pygame.draw.rect(surface, DARK_GREY, slider_rect)
+    pygame.draw.rect(surface, WHITE, slider_rect, 2)
+    ratio = (multiplier - 1) / (SPEED_MAX - 1)
+    handle_x = slider_rect.x + int(ratio * slider_rect.width)
+    handle_y = slider_rect.y + slider_rect.height // 2
+    pygame.draw.circle(surface, YELLOW, (handle_x, handle_y), slider_handle_radius)
+    label = "Max" if multiplier == SPEED_MAX else f"{multiplier}x"
+    text = render_text(f"Speed: {label}", FONT_MEDIUM, WHITE)
+    surface.blit(text, (slider_rect.right + 10, slider_rect.y))
+
+def update_slider(pos):
+    global speed_multiplier
+    slider_rect = pygame.Rect(SLIDER_RECT)
+    if slider_rect.collidepoint(pos):
+        rel = pos[0] - slider_rect.x
+        ratio = rel / slider_rect.width
+        new_mult = 1 + round(ratio * (SPEED_MAX - 1))
+        speed_multiplier = max(1, min(SPEED_MAX, new_mult))
+
+# --- Create World ---
+def is_large_world(width, height):
+    return width > GRID_WIDTH or height > GRID_HEIGHT
+
+def make_world(width=WORLD_WIDTH, height=WORLD_HEIGHT, n_snakes=SNAKE_COUNT, seed=None):
+    if is_large_world(width, height):
+        return scaled_world(n_snakes, width, height, batched_ai=True, seed=seed)
+    return World(snake_colors(n_snakes), width=width, height=height, seed=seed)
+
+# --- Header UI ---
+def draw_header(surface):
+    title = render_text("Snake Mayhem: NPC Snakes!", FONT_LARGE, YELLOW)
+    instructions = render_text("Snakes chase food & powerups! And, try to kill each other.", FONT_MEDIUM, WHITE)
+    surface.blit(title, ((BOARD_WIDTH - title.get_width()) // 2, 5))
+    surface.blit(instructions, ((BOARD_WIDTH - instructions.get_width()) // 2, 40))
+
+# --- Scoreboard ---
+SCOREBOARD_LINE = 20
+SCOREBOARD_ROWS = 10       # With more snakes, only the top scorers are listed
+SCOREBOARD_Y = BOARD_HEIGHT - 20 if BOARD_HEIGHT < WINDOW_HEIGHT - SLIDER_HEIGHT else WINDOW_HEIGHT - 20
+
+def scoreboard_rows(snakes):
+    # (text, color) per line, bottom line first.
+    rows = list(enumerate(snakes))
+    if len(rows) > SCOREBOARD_ROWS:
+        rows = sorted(rows, key=lambda row: row[1].score, reverse=True)[:SCOREBOARD_ROWS]
+    lines = []
+    for i, snake in rows:
+        status = "Alive" if snake.alive else "Respawning"
+        pu_status = ""
+        if snake.aggressive_timer > 0:
+            pu_status += f" A:{snake.aggressive_timer}"
+        if snake.shield_timer > 0:
+            pu_status += f" S:{snake.shield_timer}"
+        if snake.multiplier_timer > 0:
+            pu_status += f" M:{snake.multiplier_timer}"
+        lines.append((f"Snake {i+1}: {snake.score} ({status}){pu_status}", snake.base_color))
+    return lines
+
+def draw_scoreboard(surface, snakes, rows=None):
+    # rows from an earlier scoreboard_rows() call redraw a held scoreboard.
+    if rows is None:
+        rows = scoreboard_rows(snakes)
+    y_off = SCOREBOARD_Y
+    for text, color in rows:
+        surface.blit(render_text(text, FONT_MEDIUM, color), (5, y_off))
+        y_off -= SCOREBOARD_LINE
+
+# Screen areas redrawn every frame on top of the board's dirty rects.
+HEADER_HEIGHT = 60
+HEADER_RECT = (0, 0, BOARD_WIDTH, HEADER_HEIGHT)
+SLIDER_AREA_RECT = (0, BOARD_HEIGHT, WINDOW_WIDTH, SLIDER_HEIGHT)
+
+def scoreboard_rect(n_snakes):
+    rows = min(n_snakes, SCOREBOARD_ROWS)
+    top = SCOREBOARD_Y - SCOREBOARD_LINE * (rows - 1)
+    return pygame.Rect(0, top, BOARD_WIDTH // 2, SCOREBOARD_LINE * rows)
+
+# --- Profiler Overlay ---
+# F3 toggles per-phase profiling and its overlay; F4 writes what has been
+# collected so far to PROFILE_JSON_FILE and PROFILE_TRACE_FILE.
+PROFILE_HUD_REFRESH = 15     # Frames between overlay text updates
+PROFILE_JSON_FILE = "profile.json"
+PROFILE_TRACE_FILE = "profile_trace.json"
+
+class ProfilerOverlay:
+    """Rolling p50/p99 frame time per phase and ticks/sec, drawn over the board.
+
+    The numbers change every frame, so the panel is rendered into its own
+    surface every PROFILE_HUD_REFRESH frames instead of going through the
+    text cache.
+    """
+
+    def __init__(self, profiler, governor=None):
+        self.profiler = profiler
+        self.governor = governor
+        self.panel = None
+        self.frames = 0
+
+    def build(self):
+        font = get_font(FONT_SMALL)
+        stats = self.profiler.stats()
+        rows = [("phase", "p50 ms", "p99 ms")]
+        rows += [(phase, f"{p50 * 1e3:.2f}", f"{p99 * 1e3:.2f}") for phase, (p50, p99, _) in stats.items()]
+        rows.append(("ticks/sec", f"{self.profiler.ticks_per_second():.0f}", ""))
+        if self.governor is not None:
+            rows.append(("quality", self.governor.name, ""))
+        columns = [5, 135, 195]
+        panel = pygame.Surface((250, 8 + 14 * len(rows)), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 180))
+        for i, row in enumerate(rows):
+            for x, cell in zip(columns, row):
+                panel.blit(font.render(cell, True, WHITE), (x, 4 + 14 * i))
+        return panel
+
+    def draw(self, surface):
+        if self.panel is None or self.frames % PROFILE_HUD_REFRESH == 0:
+            self.panel = self.build()
+        self.frames += 1
+        return surface.blit(self.panel, self.panel.get_rect(topright=(BOARD_WIDTH - 5, HEADER_HEIGHT + 5)))
+
+# --- Quality Governor ---
+# While the smoothed time spent drawing and presenting a frame is over the
+# target, the governor steps down one QUALITY_LEVELS entry at a time, and
+# steps back up once drawing takes less than QUALITY_HEADROOM of the target.
+# Only drawn frames are timed. Stepping up waits longer than stepping down,
+# so it settles instead of oscillating.
+FRAME_TIME_TARGET = 1.0 / RENDER_FPS
+QUALITY_HEADROOM = 0.6
+QUALITY_SMOOTHING = 0.1      # Weight of the newest frame in the average
+QUALITY_DOWN_FRAMES = 15     # Frames to wait after a change before stepping down
+QUALITY_UP_FRAMES = 120      # ... and before stepping up
+SCOREBOARD_THROTTLE = 15     # Frames between scoreboard updates when throttled
+
+# (name, scoreboard throttled, screen shake, effects, gradient background,
+#  render every n-th frame); each level keeps the cuts of the ones before.
+QUALITY_LEVELS = [
+    ("full",                 False, True,  True,  True,  1),
+    ("throttled scoreboard", True,  True,  True,  True,  1),
+    ("no screen shake",      True,  False, True,  True,  1),
+    ("no effects",           True,  False, False, True,  1),
+    ("flat background",      True,  False, False, False, 1),
+    ("render 1/2",           True,  False, False, False, 2),
+    ("render 1/3",           True,  False, False, False, 3),
+    ("render 1/4",           True,  False, False, False, 4),
+]
+
+class QualityGovernor:
+    """Trades visual detail for frame time; see QUALITY_LEVELS.
+
+    The frame loop asks ``render_due`` once per frame (it counts them), and
+    for each frame it draws calls ``update`` with the seconds spent drawing
+    and presenting it (not simulating or waiting for the frame rate);
+    ``update`` returns True when the level changed. The loop also asks
+    ``scoreboard_due`` and reads the level's settings from the attributes.
+    """
+
+    def __init__(self, target=FRAME_TIME_TARGET, enabled=True):
+        self.target = target
+        self.enabled = enabled
+        self.frame_time = 0.0
+        self.frames = 0
+        self.last_change = 0
+        self.set_level(0)
+
+    def set_level(self, level):
+        self.level = level
+        self.name, self.throttle_scoreboard, self.screen_shake, self.effects, \
+            self.gradient, self.render_every = QUALITY_LEVELS[level]
+
+    def update(self, seconds):
+        self.frame_time += (seconds - self.frame_time) * QUALITY_SMOOTHING
+        if not self.enabled:
+            return False
+        since = self.frames - self.last_change
+        if self.frame_time > self.target and since >= QUALITY_DOWN_FRAMES \
+                and self.level < len(QUALITY_LEVELS) - 1:
+            self.set_level(self.level + 1)
+        elif self.frame_time < self.target * QUALITY_HEADROOM and since >= QUALITY_UP_FRAMES \
+                and self.level > 0:
+            self.set_level(self.level - 1)
+        else:
+            return False
+        self.last_change = self.frames
+        return True
+
+    def render_due(self):
+        self.frames += 1
+        return self.frames % self.render_every == 0
+
+    def scoreboard_due(self):
+        return not self.throttle_scoreboard or self.frames % SCOREBOARD_THROTTLE == 0
+
+# --- Main Game Loop ---
+def run_game(world, raster=False, governor=None):
+    global screen_shake_timer
+    screen = init_display()
+    clock = pygame.time.Clock()
+    game_board = pygame.Surface((BOARD_WIDTH, BOARD_HEIGHT))
+    world.subscribe(on_world_event)
+    if is_large_world(world.width, world.height):
+        camera = Camera(BOARD_WIDTH, BOARD_HEIGHT, world.width, world.height)
+        board_renderer = ChunkedBoardRenderer(game_board, world, camera)
+    else:
+        camera = None
+        board_renderer = (RasterBoardRenderer if raster else BoardRenderer)(game_board)
+    if governor is None:
+        governor = QualityGovernor()
+    scoreboard = None
+    profiler = NULL_PROFILER
+    overlay = None
+    overlay_rect = None
+    full_frame = True
+    accumulator = 0.0
+    prev_heads = None
+    last_time = time.perf_counter()
+    running = True
+    while running:
+        t = profiler.begin()
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                if overlay is None:
+                    profiler = world.profiler = Profiler()
+                    overlay = ProfilerOverlay(profiler, governor)
+                else:
+                    profiler = world.profiler = NULL_PROFILER
+                    overlay = None
+                t = profiler.begin()
+                full_frame = True
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F4 and overlay is not None:
+                profiler.export_json(PROFILE_JSON_FILE)
+                profiler.export_chrome_trace(PROFILE_TRACE_FILE)
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                if event.button == 1:
+                    update_slider(event.pos)
+            elif event.type == pygame.MOUSEMOTION:
+                if event.buttons[0]:
+                    update_slider(event.pos)
+                elif event.buttons[2] and camera is not None:
+                    camera.pan(-event.rel[0], -event.rel[1])
+            elif event.type == pygame.MOUSEWHEEL and camera is not None:
+                camera.zoom_at(pygame.mouse.get_pos(), event.y)
+        if camera is not None:
+            keys = pygame.key.get_pressed()
+            camera.pan((keys[pygame.K_RIGHT] - keys[pygame.K_LEFT]) * PAN_SPEED,
+                       (keys[pygame.K_DOWN] - keys[pygame.K_UP]) * PAN_SPEED)
+        t = profiler.end("events", t)
+
+        # Run game logic on a fixed timestep, decoupled from the render rate.
+        now = time.perf_counter()
+        accumulator += now - last_time
+        last_time = now
+        if speed_multiplier == SPEED_MAX:
+            # As fast as possible: simulate until this frame's budget is spent
+            # and render whatever tick we reached (no interpolation).
+            deadline = now + SIM_FRAME_BUDGET / RENDER_FPS
+            while time.perf_counter() < deadline:
+                world.step()
+            accumulator = 0.0
+            prev_heads, alpha = None, 1.0
+        else:
+            tick_dt = 1.0 / (BASE_TICK_HZ * speed_multiplier)
+            ticks = 0
+            while accumulator >= tick_dt and ticks < MAX_TICKS_PER_FRAME:
+                prev_heads = [snake.head() for snake in world.snakes]
+                world.step()
+                accumulator -= tick_dt
+                ticks += 1
+            if ticks == MAX_TICKS_PER_FRAME:
+                accumulator = 0.0
+            alpha = accumulator / tick_dt
+        t = profiler.end("simulate", t)
+
+        # --- Drawing ---
+        # The governor is fed only drawing and presenting time: at SPEED_MAX
+        # the simulation above fills most of every frame on purpose.
+        render_start = time.perf_counter()
+        if not governor.effects:
+            effects.clear()
+        if not governor.screen_shake:
+            screen_shake_timer = 0
+        if governor.scoreboard_due() or scoreboard is None:
+            scoreboard = scoreboard_rows(world.snakes)
+        drawn = governor.render_due()
+        if drawn:
+            # Bring the game board surface up to date (only changed cells).
+            board_dirty = board_renderer.render(world, prev_heads, alpha)
+            t = profiler.end("render_board", t)
+
+            # Screen shake: if active, choose a random offset.
+            offset_x, offset_y = 0, 0
+            shaking = screen_shake_timer > 0
+            if shaking:
+                offset_x = random.randint(-screen_shake_intensity, screen_shake_intensity)
+                offset_y = random.randint(-screen_shake_intensity, screen_shake_intensity)
+                screen_shake_timer -= 1
+
+            if full_frame or shaking:
+                # Blit the game board (with offset if shaking) onto the main screen.
+                screen.fill(BLACK)
+                screen.blit(game_board, (offset_x, offset_y))
+                t = profiler.end("blit_board", t)
+                draw_header(screen)
+                t = profiler.end("draw_header", t)
+                draw_slider(screen, speed_multiplier)
+                t = profiler.end("draw_slider", t)
+                draw_scoreboard(screen, world.snakes, scoreboard)
+                t = profiler.end("draw_scoreboard", t)
+                if overlay is not None:
+                    overlay_rect = overlay.draw(screen)
+                    t = profiler.end("draw_overlay", t)
+                pygame.display.flip()
+                t = profiler.end("display_flip", t)
+                # One more full frame after shaking to clear the offset board.
+                full_frame = shaking
+            else:
+                hud_rects = [HEADER_RECT, SLIDER_AREA_RECT, scoreboard_rect(len(world.snakes))]
+                if overlay_rect is not None:
+                    hud_rects.append(overlay_rect)
+                for rect in board_dirty:
+                    screen.blit(game_board, rect, rect)
+                for rect in hud_rects:
+                    screen.fill(BLACK, rect)
+                    screen.blit(game_board, rect, rect)
+                t = profiler.end("blit_board", t)
+                draw_header(screen)
+                t = profiler.end("draw_header", t)
+                draw_slider(screen, speed_multiplier)
+                t = profiler.end("draw_slider", t)
+                draw_scoreboard(screen, world.snakes, scoreboard)
+                t = profiler.end("draw_scoreboard", t)
+                overlay_rect = None
+                if overlay is not None:
+                    overlay_rect = overlay.draw(screen)
+                    hud_rects.append(overlay_rect)
+                    t = profiler.end("draw_overlay", t)
+                pygame.display.update(board_dirty + hud_rects)
+                t = profiler.end("display_update", t)
+        if drawn:
+            if governor.update(time.perf_counter() - render_start):
+                board_renderer.set_flat_background(not governor.gradient)
+                full_frame = True
+            # Sounds for every tick since the last drawn frame, at most one each.
+            audio.flush()
+            t = profiler.end("play_sounds", t)
+        if speed_multiplier != SPEED_MAX:
+            clock.tick(RENDER_FPS)
+            t = profiler.end("wait", t)
+        profiler.end_frame()
+
+    shutdown()
+
+def run_headless(world, ticks):
+    # Simulation only: pygame is never loaded.
+    start = time.perf_counter()
+    for _ in range(ticks):
+        world.step()
+    elapsed = time.perf_counter() - start
+    print(f"tick {world.tick}: scores {[snake.score for snake in world.snakes]} "
+          f"({ticks / elapsed:.0f} ticks/s)")
+
+# --- Entry Point ---
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Snake Mayhem: NPC snakes fighting over food and powerups.")
+    parser.add_argument("--width", type=int, default=WORLD_WIDTH, help="world width in cells")
+    parser.add_argument("--height", type=int, default=WORLD_HEIGHT, help="world height in cells")
+    parser.add_argument("--snakes", type=int, default=SNAKE_COUNT)
+    parser.add_argument("--seed", type=int, default=None, help="default: a different game every run")
+    parser.add_argument("--headless", action="store_true",
+                        help="simulate without a window and print the scores")
+    parser.add_argument("--ticks", type=int, default=HEADLESS_TICKS, help="ticks to simulate with --headless")
+    parser.add_argument("--raster", action="store_true",
+                        help="draw the board as one color-index raster (faster with many or long snakes)")
+    parser.add_argument("--no-governor", action="store_true",
+                        help="always draw at full quality instead of trading detail for frame time")
+    parser.add_argument("--mute", action="store_true", help="no sound")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    world = make_world(args.width, args.height, args.snakes, args.seed)
+    if args.headless:
+        run_headless(world, args.ticks)
+        return
+    if args.mute:
+        audio.enabled = False
+    run_game(world, raster=args.raster, governor=QualityGovernor(enabled=not args.no_governor))
+
+if __name__ == "__main__":
+    main()
+    sys.exit()
@@ -0,0 +1,490 @@
+"""Stream a running match to spectators over TCP.
+
+    python spectate.py serve --port 7777 --tps 10   # headless match with a server
+    python spectate.py watch --port 7777            # window following it
+
+A spectator gets a hello (board size and snake colors) and a full snapshot
+when it connects, then one delta per tick. Records are framed like replay
+records, ``kind (1 byte) + payload length (uint32) + payload``:
+
+* ``H`` hello: magic, version, width, height and snake count, then colors.
+* ``K`` snapshot: a replay keyframe of the world between ticks.
+* ``D`` delta: the tick number followed by ops, each an opcode byte and a
+  fixed struct: head pushes, tail trims, score and timer changes, deaths,
+  respawns, and item spawns, pickups and expiries, in the order they
+  happened.
+
+A delta is encoded once per tick however many spectators there are, and is
+usually tens of bytes where a snapshot is kilobytes. Sockets never block the
+simulation: output is queued per spectator, and one that falls more than
+``max_backlog`` bytes behind has its unsent ticks dropped and is resynced
+with a fresh snapshot. Spectators apply ops without running the tick rules.
+"""
+import argparse
+import socket
+import struct
+import time
+from collections import deque
+
+from replay import RECORD, TICK, COLOR, encode_keyframe, decode_keyframe
+from world import World, DEFAULT_SNAKES, DIRECTIONS, DEATH_CAUSES, POWERUP_TYPES, GRID_WIDTH, GRID_HEIGHT
+
+MAGIC = b"SMSP"
+VERSION = 1
+HOST = "127.0.0.1"
+PORT = 7777
+MAX_BACKLOG = 1 << 20        # Bytes queued for one spectator before it is resynced
+RECV_SIZE = 1 << 16
+
+HELLO = struct.Struct("<4sBHHH")
+OPCODE = struct.Struct("<B")
+
+# Opcodes and their payloads ("snake" is the snake's index).
+OP_HEAD = 0                  # snake, x, y: pushed a new head
+OP_TRIM = 1                  # snake, length: tail popped or cut down to length
+OP_SCORE = 2                 # snake, score
+OP_TIMERS = 3                # snake, respawn flash, aggressive, shield, multiplier
+OP_DEATH = 4                 # snake, DEATH_CAUSES index
+OP_SPAWN = 5                 # snake, x, y, DIRECTIONS index
+OP_CUT = 6                   # snake, x, y
+OP_ADD_FOOD = 7              # x, y
+OP_EAT = 8                   # snake, x, y
+OP_ADD_OBSTACLE = 9          # x, y
+OP_EXPIRE_OBSTACLE = 10      # x, y
+OP_ADD_POWERUP = 11          # x, y, POWERUP_TYPES index
+OP_TAKE_POWERUP = 12         # snake, x, y
+OP_EXPIRE_POWERUP = 13       # x, y
+
+OPS = {
+    OP_HEAD: struct.Struct("<HHH"),
+    OP_TRIM: struct.Struct("<HI"),
+    OP_SCORE: struct.Struct("<Hi"),
+    OP_TIMERS: struct.Struct("<Hhhhh"),
+    OP_DEATH: struct.Struct("<HB"),
+    OP_SPAWN: struct.Struct("<HHHB"),
+    OP_CUT: struct.Struct("<HHH"),
+    OP_ADD_FOOD: struct.Struct("<HH"),
+    OP_EAT: struct.Struct("<HHH"),
+    OP_ADD_OBSTACLE: struct.Struct("<HH"),
+    OP_EXPIRE_OBSTACLE: struct.Struct("<HH"),
+    OP_ADD_POWERUP: struct.Struct("<HHB"),
+    OP_TAKE_POWERUP: struct.Struct("<HHH"),
+    OP_EXPIRE_POWERUP: struct.Struct("<HH"),
+}
+
+
+class SpectateError(Exception):
+    pass
+
+
+def encode_record(kind, payload):
+    return RECORD.pack(kind, len(payload)) + payload
+
+
+def encode_op(op, *values):
+    return OPCODE.pack(op) + OPS[op].pack(*values)
+
+
+def snake_timers(snake):
+    return (snake.respawn_flash_timer, snake.aggressive_timer, snake.shield_timer, snake.multiplier_timer)
+
+
+# --- Server ---
+class Spectator:
+    """One connected spectator and the records queued for it."""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.queue = deque()
+        self.offset = 0            # Bytes of queue[0] already sent
+        self.queued = 0
+
+    def send(self, record):
+        self.queue.append(record)
+        self.queued += len(record)
+
+    def resync(self, records):
+        # Drop every unsent record except one already part-way out.
+        keep = [self.queue[0]] if self.queue and self.offset else []
+        self.queue = deque(keep)
+        self.queued = len(keep[0]) - self.offset if keep else 0
+        for record in records:
+            self.send(record)
+
+    def flush(self):
+        # Sends what the socket takes without blocking; raises OSError once
+        # the spectator has gone.
+        while self.queue:
+            record = self.queue[0]
+            sent = self.sock.send(memoryview(record)[self.offset:])
+            self.offset += sent
+            self.queued -= sent
+            if self.offset < len(record):
+                return
+            self.queue.popleft()
+            self.offset = 0
+
+
+class SpectatorServer:
+    """Publishes a World to spectators; call ``publish`` after every step.
+
+    Ops for items, deaths and respawns come from world events as they happen;
+    head, length, score and timer changes are found by comparing each snake
+    with what was last sent.
+    """
+
+    def __init__(self, world, host=HOST, port=PORT, max_backlog=MAX_BACKLOG):
+        self.world = world
+        self.max_backlog = max_backlog
+        self.listener = socket.create_server((host, port))
+        self.listener.setblocking(False)
+        self.address = self.listener.getsockname()
+        self.spectators = []
+        self.snake_index = {id(snake): i for i, snake in enumerate(world.snakes)}
+        self.ops = []
+        self.sent = [self.snake_view(snake) for snake in world.snakes]
+        colors = b"".join(COLOR.pack(*snake.base_color) for snake in world.snakes)
+        self.hello = encode_record(b"H", HELLO.pack(MAGIC, VERSION, world.width, world.height,
+                                                    len(world.snakes)) + colors)
+        world.subscribe(self.on_event)
+
+    @staticmethod
+    def snake_view(snake):
+        # What spectators know of a snake: head, length, score, timers.
+        return [snake.head(), len(snake.segments), snake.score, snake_timers(snake)]
+
+    def on_event(self, event, snake, pos, detail):
+        ops = self.ops
+        if event == "spawn_food":
+            ops.append(encode_op(OP_ADD_FOOD, *pos))
+        elif event == "eat":
+            ops.append(encode_op(OP_EAT, self.snake_index[id(snake)], *pos))
+        elif event == "spawn_obstacle":
+            ops.append(encode_op(OP_ADD_OBSTACLE, *pos))
+        elif event == "expire_obstacle":
+            ops.append(encode_op(OP_EXPIRE_OBSTACLE, *pos))
+        elif event == "spawn_powerup":
+            ops.append(encode_op(OP_ADD_POWERUP, *pos, POWERUP_TYPES.index(detail[1])))
+        elif event == "powerup":
+            ops.append(encode_op(OP_TAKE_POWERUP, self.snake_index[id(snake)], *pos))
+        elif event == "expire_powerup":
+            ops.append(encode_op(OP_EXPIRE_POWERUP, *pos))
+        elif event == "death":
+            ops.append(encode_op(OP_DEATH, self.snake_index[id(snake)], DEATH_CAUSES.index(detail)))
+        elif event == "cut":
+            ops.append(encode_op(OP_CUT, self.snake_index[id(snake)], *pos))
+        elif event == "spawn":
+            i = self.snake_index[id(snake)]
+            ops.append(encode_op(OP_SPAWN, i, *pos, DIRECTIONS.index(detail)))
+            self.sent[i][0:2] = [pos, 1]
+
+    def delta(self):
+        # The ops of the tick just stepped, ended by the snake changes.
+        ops = self.ops
+        for i, (snake, sent) in enumerate(zip(self.world.snakes, self.sent)):
+            head, length = snake.head(), len(snake.segments)
+            if head != sent[0]:
+                ops.append(encode_op(OP_HEAD, i, *head))
+                sent[0] = head
+                sent[1] += 1
+            if length != sent[1]:
+                ops.append(encode_op(OP_TRIM, i, length))
+                sent[1] = length
+            if snake.score != sent[2]:
+                ops.append(encode_op(OP_SCORE, i, snake.score))
+                sent[2] = snake.score
+            timers = snake_timers(snake)
+            if timers != sent[3]:
+                ops.append(encode_op(OP_TIMERS, i, *timers))
+                sent[3] = timers
+        payload = TICK.pack(self.world.tick - 1) + b"".join(ops)
+        self.ops = []
+        return encode_record(b"D", payload)
+
+    def snapshot(self):
+        return encode_record(b"K", encode_keyframe(self.world.get_state()))
+
+    def publish(self):
+        delta = self.delta()
+        for spectator in self.spectators:
+            spectator.send(delta)
+        snapshot = None
+        for spectator in self.spectators:
+            if spectator.queued > self.max_backlog:
+                snapshot = snapshot or self.snapshot()
+                spectator.resync([snapshot])
+        # Newcomers start from the state this delta led to.
+        while True:
+            try:
+                sock, _ = self.listener.accept()
+            except BlockingIOError:
+                break
+            sock.setblocking(False)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            spectator = Spectator(sock)
+            snapshot = snapshot or self.snapshot()
+            spectator.send(self.hello)
+            spectator.send(snapshot)
+            self.spectators.append(spectator)
+        self.flush()
+
+    def flush(self):
+        for spectator in self.spectators[:]:
+            try:
+                spectator.flush()
+            except BlockingIOError:
+                pass
+            except OSError:
+                spectator.sock.close()
+                self.spectators.remove(spectator)
+
+    def close(self):
+        for spectator in self.spectators:
+            spectator.sock.close()
+        self.spectators = []
+        self.listener.close()
+
+
+# --- Client ---
+class MirrorWorld(World):
+    """A World kept in step by a spectator stream instead of the tick rules.
+
+    Ops are applied to the same lists, segments and grid the renderers read,
+    and re-emitted as world events so effect and chunk listeners still work.
+    """
+
+    def apply_delta(self, payload):
+        tick, = TICK.unpack_from(payload)
+        offset = TICK.size
+        while offset < len(payload):
+            op, = OPCODE.unpack_from(payload, offset)
+            fmt = OPS.get(op)
+            if fmt is None:
+                raise SpectateError(f"tick {tick}: unknown op {op}")
+            self.apply_op(op, fmt.unpack_from(payload, offset + OPCODE.size))
+            offset += OPCODE.size + fmt.size
+        self.tick = tick + 1
+
+    def remove_timed(self, items, pos):
+        item = items.pop(pos)
+        item['expires'] = None
+        self.grid.clear_item(pos)
+        return item
+
+    def apply_op(self, op, values):
+        if op == OP_HEAD:
+            i, x, y = values
+            self.snakes[i].segments.push_head((x, y))
+            self.grid.add_snake((x, y))
+        elif op == OP_TRIM:
+            i, length = values
+            segments = self.snakes[i].segments
+            while len(segments) > length:
+                self.grid.remove_snake(segments.pop_tail())
+        elif op == OP_SCORE:
+            i, score = values
+            self.snakes[i].score = score
+        elif op == OP_TIMERS:
+            snake = self.snakes[values[0]]
+            snake.respawn_flash_timer, snake.aggressive_timer, snake.shield_timer, \
+                snake.multiplier_timer = values[1:]
+        elif op == OP_DEATH:
+            i, cause = values
+            self.snakes[i].alive = False
+            self.emit("death", self.snakes[i], self.snakes[i].head(), DEATH_CAUSES[cause])
+        elif op == OP_SPAWN:
+            i, x, y, direction = values
+            snake = self.snakes[i]
+            for seg in snake.segments.reset((x, y)):
+                self.grid.remove_snake(seg)
+            self.grid.add_snake((x, y))
+            snake.direction = DIRECTIONS[direction]
+            snake.alive = True
+            self.emit("spawn", snake, (x, y), snake.direction)
+        elif op == OP_CUT:
+            i, x, y = values
+            self.emit("cut", self.snakes[i], (x, y))
+        elif op == OP_ADD_FOOD:
+            self.place_food(values)
+        elif op == OP_EAT:
+            i, x, y = values
+            del self.foods[(x, y)]
+            self.grid.clear_item((x, y))
+            self.emit("eat", self.snakes[i], (x, y))
+        elif op == OP_ADD_OBSTACLE:
+            self.place_obstacle(values, 0)
+        elif op == OP_EXPIRE_OBSTACLE:
+            self.remove_timed(self.obstacles, values)
+            self.emit("expire_obstacle", None, values)
+        elif op == OP_ADD_POWERUP:
+            x, y, pu_type = values
+            self.place_powerup((x, y), 0, POWERUP_TYPES[pu_type])
+        elif op == OP_TAKE_POWERUP:
+            i, x, y = values
+            pu = self.remove_timed(self.powerups, (x, y))
+            self.emit("powerup", self.snakes[i], (x, y), pu['type'])
+        elif op == OP_EXPIRE_POWERUP:
+            self.remove_timed(self.powerups, values)
+            self.emit("expire_powerup", None, values)
+
+
+class SpectatorClient:
+    """Reads a spectator stream into a MirrorWorld.
+
+    ``poll`` applies whatever has arrived without blocking and returns what
+    changed: "hello" once the world exists, "snapshot" when it was replaced
+    wholesale (renderers should redraw everything), "delta" for ticks.
+    """
+
+    def __init__(self, host=HOST, port=PORT, timeout=5.0):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setblocking(False)
+        self.buffer = bytearray()
+        self.world = None
+        self.n_snakes = 0
+        self.closed = False
+
+    def receive(self):
+        while True:
+            try:
+                data = self.sock.recv(RECV_SIZE)
+            except BlockingIOError:
+                return
+            if not data:
+                self.closed = True
+                return
+            self.buffer += data
+
+    def records(self):
+        buffer = self.buffer
+        offset = 0
+        while len(buffer) - offset >= RECORD.size:
+            kind, length = RECORD.unpack_from(buffer, offset)
+            end = offset + RECORD.size + length
+            if len(buffer) < end:
+                break
+            yield kind, bytes(buffer[offset + RECORD.size:end])
+            offset = end
+        del buffer[:offset]
+
+    def poll(self):
+        self.receive()
+        changes = set()
+        for kind, payload in self.records():
+            if kind == b"H":
+                self.on_hello(payload)
+                changes.add("hello")
+            elif self.world is None:
+                raise SpectateError("stream did not start with a hello")
+            elif kind == b"K":
+                self.world.load_state(decode_keyframe(payload, self.n_snakes))
+                changes.add("snapshot")
+            elif kind == b"D":
+                self.world.apply_delta(payload)
+                changes.add("delta")
+            else:
+                raise SpectateError(f"unknown record kind {kind!r}")
+        return changes
+
+    def on_hello(self, payload):
+        magic, version, width, height, n_snakes = HELLO.unpack_from(payload)
+        if magic != MAGIC or version != VERSION:
+            raise SpectateError(f"not a version {VERSION} spectator stream")
+        colors = [COLOR.unpack_from(payload, HELLO.size + i * COLOR.size) for i in range(n_snakes)]
+        self.n_snakes = n_snakes
+        self.world = MirrorWorld(colors, width=width, height=height, food_count=0,
+                                 max_obstacles=0, max_powerups=0)
+
+    def close(self):
+        self.sock.close()
+
+
+# --- CLI ---
+def serve(args):
+    world = World([color for _, color in DEFAULT_SNAKES], width=args.width, height=args.height,
+                  seed=args.seed)
+    server = SpectatorServer(world, args.host, args.port)
+    print(f"serving on {server.address[0]}:{server.address[1]}", flush=True)
+    tick_dt = 1.0 / args.tps
+    deadline = time.perf_counter()
+    try:
+        while args.ticks is None or world.tick < args.ticks:
+            world.step()
+            server.publish()
+            deadline += tick_dt
+            while True:
+                wait = deadline - time.perf_counter()
+                if wait <= 0:
+                    break
+                time.sleep(min(wait, 0.01))
+                server.flush()
+    except KeyboardInterrupt:
+        pass
+    server.close()
+
+
+def watch(args):
+    import pygame
+    import snake as game
+
+    client = SpectatorClient(args.host, args.port)
+    screen = game.init_display()
+    clock = pygame.time.Clock()
+    board = pygame.Surface((game.BOARD_WIDTH, game.BOARD_HEIGHT))
+    renderer = None
+    while not client.closed:
+        camera = renderer.camera if isinstance(renderer, game.ChunkedBoardRenderer) else None
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                client.closed = True
+            elif event.type == pygame.MOUSEMOTION and event.buttons[2] and camera is not None:
+                camera.pan(-event.rel[0], -event.rel[1])
+            elif event.type == pygame.MOUSEWHEEL and camera is not None:
+                camera.zoom_at(pygame.mouse.get_pos(), event.y)
+        changes = client.poll()
+        world = client.world
+        if "hello" in changes:
+            world.subscribe(game.on_world_event)
+            if world.width > game.GRID_WIDTH or world.height > game.GRID_HEIGHT:
+                camera = game.Camera(game.BOARD_WIDTH, game.BOARD_HEIGHT, world.width, world.height)
+                renderer = game.ChunkedBoardRenderer(board, world, camera)
+            else:
+                renderer = game.BoardRenderer(board)
+        elif "snapshot" in changes:
+            renderer.invalidate()
+        if renderer is not None:
+            renderer.render(world)
+            screen.fill(game.BLACK)
+            screen.blit(board, (0, 0))
+            game.draw_header(screen)
+            game.draw_scoreboard(screen, world.snakes)
+            pygame.display.flip()
+            game.audio.flush()
+        clock.tick(game.RENDER_FPS)
+    client.close()
+    game.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a Snake Mayhem match to spectators, or watch one.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    srv = sub.add_parser("serve", help="run a headless match and stream it")
+    srv.add_argument("--host", default=HOST)
+    srv.add_argument("--port", type=int, default=PORT)
+    srv.add_argument("--tps", type=float, default=10.0, help="ticks per second")
+    srv.add_argument("--ticks", type=int, default=None, help="stop after this many ticks")
+    srv.add_argument("--seed", type=int, default=0)
+    srv.add_argument("--width", type=int, default=GRID_WIDTH)
+    srv.add_argument("--height", type=int, default=GRID_HEIGHT)
+    cli = sub.add_parser("watch", help="render a served match")
+    cli.add_argument("--host", default=HOST)
+    cli.add_argument("--port", type=int, default=PORT)
+    args = parser.parse_args(argv)
+    if args.command == "serve":
+        serve(args)
+    else:
+        watch(args)
+
+
+if __name__ == "__main__":
+    main()
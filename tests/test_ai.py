@@ -0,0 +1,22 @@
+import pytest
+
+from ai import get_direction_for_snake, plan_moves
+from world import scaled_world
+
+
+# Small boards get crowded (head-ons, blocking); the large ones take the
+# distance-transform path for food and powerups.
+@pytest.mark.parametrize("n_snakes, size, ticks", [
+    (2, 20, 300),
+    (6, 50, 300),
+    (24, 40, 150),
+    (120, 100, 40),
+])
+def test_plan_moves_matches_get_direction_for_snake(n_snakes, size, ticks):
+    world = scaled_world(n_snakes, size, size, seed=n_snakes)
+    for _ in range(ticks):
+        _, choices = plan_moves(world)
+        for i, snake in enumerate(world.snakes):
+            if snake.alive:
+                assert choices[i] == get_direction_for_snake(world, snake), (world.tick, i)
+        world.step()
@@ -0,0 +1,52 @@
+from batch import BatchWorld, step_batch
+from replay import encode_move
+from world import World, DEFAULT_SNAKES
+
+
+def comparable(state):
+    # Boards keep their own tick and random stream, and no item order.
+    state = dict(state)
+    state.pop('rng', None)
+    state.pop('tick', None)
+    state['obstacles'] = sorted(state['obstacles'])
+    state['powerups'] = sorted(state['powerups'])
+    return state
+
+
+def world_transitions(seeds, ticks):
+    # (state before, state after, encoded moves) for every World.step that
+    # spawned nothing: spawns draw from the World's random stream, which a
+    # batch board does not share.
+    transitions = []
+    for seed in seeds:
+        world = World([color for _, color in DEFAULT_SNAKES], seed=seed)
+        events = []
+        world.subscribe(lambda event, snake, pos, detail: events.append(event))
+        for _ in range(ticks):
+            before = world.get_state()
+            events.clear()
+            world.step()
+            if not any(event.startswith("spawn") for event in events):
+                transitions.append((before, world.get_state(), [encode_move(move) for move in world.moves]))
+    return transitions
+
+
+def test_step_batch_matches_world_step():
+    transitions = world_transitions(range(3), 800)
+    assert len(transitions) > 1000
+    batch = BatchWorld(len(transitions), obstacle_chance=0, powerup_chance=0, seed=1)
+    for b, (before, _, _) in enumerate(transitions):
+        batch.load_state(b, before)
+    step_batch(batch)
+    for b, (before, after, moves) in enumerate(transitions):
+        assert list(batch.moves[b]) == moves, before['tick']
+        assert comparable(batch.get_state(b)) == comparable(after), before['tick']
+
+
+def test_load_state_round_trip():
+    world = World([color for _, color in DEFAULT_SNAKES], seed=5)
+    for _ in range(300):
+        world.step()
+    batch = BatchWorld(2, seed=0)
+    batch.load_state(1, world.get_state())
+    assert comparable(batch.get_state(1)) == comparable(world.get_state())
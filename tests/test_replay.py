@@ -0,0 +1,52 @@
+import pytest
+
+from replay import Recorder, ReplayPlayer
+from world import World, DEFAULT_SNAKES
+
+
+def played_state(world):
+    # Playback never draws random numbers, so its generator state is unrelated.
+    state = world.get_state()
+    del state['rng']
+    return state
+
+
+@pytest.mark.parametrize("batched_ai", [False, True])
+def test_seek_matches_live_state(tmp_path, batched_ai):
+    path = tmp_path / "match.smr"
+    world = World([color for _, color in DEFAULT_SNAKES] * 3, seed=7, batched_ai=batched_ai)
+    recorder = Recorder(world, open(path, 'wb'), keyframe_interval=250)
+    # Keyframe boundaries, the ticks around them and the end of the recording.
+    checkpoints = {0, 1, 249, 250, 251, 637, 1000, 1499}
+    live = {}
+    for tick in range(1500):
+        if tick in checkpoints:
+            live[tick] = played_state(world)
+        recorder.step()
+    live[1500] = played_state(world)
+    recorder.close()
+
+    player = ReplayPlayer(path)
+    assert player.end_tick == 1500
+    # Out of order, so seeks go both back and forward across keyframes.
+    for tick in (1000, 1, 1500, 250, 637, 0, 251, 1499, 249):
+        assert played_state(player.seek(tick)) == live[tick], tick
+    player.close()
+
+
+def test_step_replays_every_tick(tmp_path):
+    path = tmp_path / "match.smr"
+    world = World([color for _, color in DEFAULT_SNAKES], seed=11)
+    recorder = Recorder(world, open(path, 'wb'), keyframe_interval=100)
+    live = []
+    for _ in range(400):
+        recorder.step()
+        live.append(played_state(world))
+    recorder.close()
+
+    player = ReplayPlayer(path)
+    for state in live:
+        assert player.step()
+        assert played_state(player.world) == state
+    assert not player.step()
+    player.close()
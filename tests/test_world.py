@@ -0,0 +1,60 @@
+import pytest
+
+from ai import LookaheadAI
+from world import World, DEFAULT_SNAKES
+
+AI_MODES = [{}, {'batched_ai': True}, {'lookahead_ai': True}]
+
+
+def make_world(**options):
+    # Frequent obstacles and powerups so forks carry live expiry queues.
+    world = World([color for _, color in DEFAULT_SNAKES], seed=3, obstacle_chance=0.2,
+                  powerup_chance=0.2, **options)
+    if world.lookahead is not None:
+        # A time budget would make the searches depend on the machine's speed.
+        world.lookahead = LookaheadAI(world, budget_us=None)
+    return world
+
+
+def run(world, ticks):
+    for _ in range(ticks):
+        world.step()
+    return world.get_state()
+
+
+@pytest.mark.parametrize("options", AI_MODES)
+def test_fork_plays_out_like_the_original(options):
+    world = make_world(**options)
+    run(world, 200)
+    fork = world.fork()
+    for _ in range(400):
+        world.step()
+        fork.step()
+        assert fork.moves == world.moves, world.tick
+    assert fork.get_state() == world.get_state()
+
+
+@pytest.mark.parametrize("options", AI_MODES)
+def test_fork_is_independent(options):
+    world = make_world(**options)
+    run(world, 200)
+    before = world.get_state()
+    fork = world.fork()
+    run(fork, 100)
+    assert world.get_state() == before
+    assert fork.grid.snake_count.sum() == sum(len(snake.segments) for snake in fork.snakes)
+    assert world.grid.snake_count.sum() == sum(len(snake.segments) for snake in world.snakes)
+
+
+@pytest.mark.parametrize("options", AI_MODES)
+def test_restore_replays_the_same_future(options):
+    world = make_world(**options)
+    run(world, 200)
+    snapshot = world.snapshot()
+    expected = run(world, 300)
+    world.restore(snapshot)
+    assert run(world, 300) == expected
+    # A snapshot stays valid after being restored from.
+    world.restore(snapshot)
+    world.restore(snapshot)
+    assert run(world, 300) == expected
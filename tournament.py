@@ -0,0 +1,162 @@
+"""Run batches of headless matches across processes and summarize them.
+
+    python tournament.py --matches 1000 --ticks 2000 --json summary.json --csv summary.csv
+
+Each match is an independent World seeded with ``--seed + index``; results
+are aggregated per snake color (scores, wins, kills, death causes and
+powerups picked up).
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from world import (
+    World, DEFAULT_SNAKES, DEATH_CAUSES, POWERUP_TYPES, GRID_WIDTH, GRID_HEIGHT,
+    FOOD_COUNT, MAX_OBSTACLES, MAX_POWERUPS, OBSTACLE_SPAWN_CHANCE, POWERUP_SPAWN_CHANCE,
+)
+
+
+def new_stats():
+    return {
+        'wins': 0,
+        'score': 0,
+        'kills': 0,
+        'deaths': {cause: 0 for cause in DEATH_CAUSES},
+        'powerups': {pu_type: 0 for pu_type in POWERUP_TYPES},
+    }
+
+
+def lineup(n_snakes):
+    # Snakes beyond the default six reuse its colors, so stats are per color.
+    return [DEFAULT_SNAKES[i % len(DEFAULT_SNAKES)] for i in range(n_snakes)]
+
+
+# --- Single Match (runs in a worker process) ---
+def run_match(config):
+    snakes = lineup(config['snakes'])
+    world = World([color for _, color in snakes],
+                  width=config['width'], height=config['height'],
+                  food_count=config['food_count'],
+                  max_obstacles=config['max_obstacles'], max_powerups=config['max_powerups'],
+                  obstacle_chance=config['obstacle_chance'], powerup_chance=config['powerup_chance'],
+                  batched_ai=config['batched_ai'], lookahead_ai=config['lookahead_ai'],
+                  seed=config['seed'])
+    names = {id(snake): name for snake, (name, _) in zip(world.snakes, snakes)}
+    stats = {name: new_stats() for name, _ in snakes}
+
+    def on_event(event, snake, pos, detail):
+        if event == "death":
+            stats[names[id(snake)]]['deaths'][detail] += 1
+        elif event == "kill":
+            stats[names[id(snake)]]['kills'] += 1
+        elif event == "powerup":
+            stats[names[id(snake)]]['powerups'][detail] += 1
+
+    world.subscribe(on_event)
+    for _ in range(config['ticks']):
+        world.step()
+
+    for snake in world.snakes:
+        stats[names[id(snake)]]['score'] += snake.score
+    # Every color sharing the top score is credited with the win.
+    best = max(s['score'] for s in stats.values())
+    for s in stats.values():
+        if s['score'] == best:
+            s['wins'] = 1
+    return stats
+
+
+# --- Aggregation ---
+def merge_stats(total, match):
+    for name, s in match.items():
+        t = total.setdefault(name, new_stats())
+        t['wins'] += s['wins']
+        t['score'] += s['score']
+        t['kills'] += s['kills']
+        for cause, n in s['deaths'].items():
+            t['deaths'][cause] += n
+        for pu_type, n in s['powerups'].items():
+            t['powerups'][pu_type] += n
+
+
+def run_tournament(config, matches, workers=None):
+    configs = [dict(config, seed=config['seed'] + i) for i in range(matches)]
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, matches // (4 * workers))
+    totals = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for result in pool.map(run_match, configs, chunksize=chunksize):
+            merge_stats(totals, result)
+    for t in totals.values():
+        t['mean_score'] = t['score'] / matches if matches else 0.0
+    return {'matches': matches, 'config': config, 'colors': totals}
+
+
+def write_csv(summary, path):
+    fields = (['color', 'wins', 'score', 'mean_score', 'kills']
+              + [f"deaths_{cause}" for cause in DEATH_CAUSES]
+              + [f"powerups_{pu_type}" for pu_type in POWERUP_TYPES])
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(fields)
+        for name, t in summary['colors'].items():
+            writer.writerow([name, t['wins'], t['score'], t['mean_score'], t['kills']]
+                            + [t['deaths'][cause] for cause in DEATH_CAUSES]
+                            + [t['powerups'][pu_type] for pu_type in POWERUP_TYPES])
+
+
+# --- CLI ---
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run headless Snake Mayhem matches in parallel.")
+    parser.add_argument("--matches", type=int, default=100)
+    parser.add_argument("--ticks", type=int, default=2000, help="ticks per match")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first match; match i uses seed + i")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--snakes", type=int, default=len(DEFAULT_SNAKES))
+    parser.add_argument("--width", type=int, default=GRID_WIDTH)
+    parser.add_argument("--height", type=int, default=GRID_HEIGHT)
+    parser.add_argument("--food-count", type=int, default=FOOD_COUNT)
+    parser.add_argument("--max-obstacles", type=int, default=MAX_OBSTACLES)
+    parser.add_argument("--max-powerups", type=int, default=MAX_POWERUPS)
+    parser.add_argument("--obstacle-chance", type=float, default=OBSTACLE_SPAWN_CHANCE)
+    parser.add_argument("--powerup-chance", type=float, default=POWERUP_SPAWN_CHANCE)
+    parser.add_argument("--batched-ai", action="store_true", help="use the vectorized planner")
+    parser.add_argument("--lookahead-ai", action="store_true",
+                        help="use the lookahead AI (time-budgeted, so not reproducible run to run)")
+    parser.add_argument("--json", help="write the summary here instead of stdout")
+    parser.add_argument("--csv", help="also write per-color rows as CSV")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = {
+        'seed': args.seed,
+        'ticks': args.ticks,
+        'snakes': args.snakes,
+        'width': args.width,
+        'height': args.height,
+        'food_count': args.food_count,
+        'max_obstacles': args.max_obstacles,
+        'max_powerups': args.max_powerups,
+        'obstacle_chance': args.obstacle_chance,
+        'powerup_chance': args.powerup_chance,
+        'batched_ai': args.batched_ai,
+        'lookahead_ai': args.lookahead_ai,
+    }
+    summary = run_tournament(config, args.matches, args.workers)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summary, f, indent=2)
+    else:
+        json.dump(summary, sys.stdout, indent=2)
+        print()
+    if args.csv:
+        write_csv(summary, args.csv)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,598 @@
+import heapq
+import random
+from collections import deque
+
+from ai import DIRECTIONS, LookaheadAI, get_direction_for_snake, plan_moves
+from grid import OccupancyGrid, FOOD, OBSTACLE, POWERUP
+from profiler import NULL_PROFILER
+
+# --- Simulation Constants ---
+GRID_WIDTH  = 50
+GRID_HEIGHT = 50
+
+FOOD_COUNT    = 5   # How many food pieces are concurrently on board
+MAX_OBSTACLES = 10
+MAX_POWERUPS  = 5
+OBSTACLE_SPAWN_CHANCE = 0.02   # Per tick, while below MAX_OBSTACLES
+POWERUP_SPAWN_CHANCE  = 0.01   # Per tick, while below MAX_POWERUPS
+
+RESPAWN_TICKS = 50
+POWERUP_TICKS = 50
+RESPAWN_FLASH_TICKS = 30
+
+POWERUP_TYPES = ["aggressive", "shield", "multiplier"]
+
+# World.moves entry for a snake that was dead during the tick.
+NOT_MOVED = "dead"
+
+# Why a snake died, passed as the detail of "death" events.
+DEATH_CAUSES = ["trapped", "wall", "obstacle", "head_on", "attacked"]
+
+# Default lineup: six snakes with distinct colors (name, RGB).
+DEFAULT_SNAKES = [
+    ("red",    (220, 20, 60)),
+    ("green",  (50, 205, 50)),
+    ("blue",   (65, 105, 225)),
+    ("yellow", (255, 215, 0)),
+    ("purple", (128, 0, 128)),
+    ("cyan",   (0, 255, 255)),
+]
+
+
+# --- Snake Segments ---
+class Segments:
+    """Ordered snake body (head first) with O(1) membership.
+
+    A deque keeps the order and a per-cell counter mirrors it, so head push,
+    tail pop and ``pos in segments`` are O(1); a self-cut pops from the tail
+    and costs only the number of segments removed.
+    """
+
+    def __init__(self, init_pos):
+        self.order = deque([init_pos])
+        self.counts = {init_pos: 1}
+
+    @classmethod
+    def from_cells(cls, cells):
+        # cells is head first.
+        segments = cls(cells[0])
+        for pos in cells[1:]:
+            segments.order.append(pos)
+            segments.counts[pos] = segments.counts.get(pos, 0) + 1
+        return segments
+
+    def __len__(self):
+        return len(self.order)
+
+    def __iter__(self):
+        return iter(self.order)
+
+    def __contains__(self, pos):
+        return pos in self.counts
+
+    def __getitem__(self, index):
+        return self.order[index]
+
+    def count(self, pos):
+        return self.counts.get(pos, 0)
+
+    def push_head(self, pos):
+        self.order.appendleft(pos)
+        self.counts[pos] = self.counts.get(pos, 0) + 1
+
+    def pop_tail(self):
+        pos = self.order.pop()
+        n = self.counts[pos] - 1
+        if n:
+            self.counts[pos] = n
+        else:
+            del self.counts[pos]
+        return pos
+
+    def cut_at(self, pos):
+        # Drop everything from the second occurrence of pos (counting from
+        # the head) to the tail; returns the removed cells.
+        removed = []
+        while self.counts.get(pos, 0) > 1:
+            removed.append(self.pop_tail())
+        return removed
+
+    def copy(self):
+        segments = Segments.__new__(Segments)
+        segments.order = self.order.copy()
+        segments.counts = self.counts.copy()
+        return segments
+
+    def reset(self, pos):
+        old = list(self.order)
+        self.order = deque([pos])
+        self.counts = {pos: 1}
+        return old
+
+
+# --- Snake Class ---
+class Snake:
+    def __init__(self, base_color, init_pos, direction):
+        self.base_color = base_color
+        self.segments = Segments(init_pos)
+        self.direction = direction
+        self.score = 0
+        self.alive = True
+        self.respawn_tick = 0          # While dead: the tick it respawns on
+        self.respawn_flash_timer = 0
+        self.aggressive_timer = 0
+        self.shield_timer = 0
+        self.multiplier_timer = 0
+
+    def head(self):
+        return self.segments[0]
+
+    def copy(self):
+        snake = Snake.__new__(Snake)
+        snake.__dict__.update(self.__dict__)
+        snake.segments = self.segments.copy()
+        return snake
+
+
+# --- Expiry Scheduling ---
+class ExpiryQueue:
+    """Timed entries kept in a heap keyed by the tick they expire on.
+
+    Entries are dicts whose 'expires' holds that tick; due entries come out
+    in (tick, insertion) order, so a tick only touches what expires in it.
+    An entry removed early is cancelled by setting its 'expires' to None.
+    """
+
+    def __init__(self):
+        self.heap = []
+        self.seq = 0
+
+    def push(self, entry):
+        heapq.heappush(self.heap, (entry['expires'], self.seq, entry))
+        self.seq += 1
+
+    def copy(self, entries):
+        # entries maps id() of each live entry to its replacement; cancelled
+        # entries are dropped.
+        queue = ExpiryQueue()
+        queue.heap = [(expires, seq, entries[id(entry)]) for expires, seq, entry in self.heap
+                      if entry['expires'] == expires]
+        heapq.heapify(queue.heap)
+        queue.seq = self.seq
+        return queue
+
+    def pop_due(self, tick):
+        due = []
+        while self.heap and self.heap[0][0] <= tick:
+            expires, _, entry = heapq.heappop(self.heap)
+            if entry['expires'] == expires:
+                due.append(entry)
+        return due
+
+
+# --- World ---
+class World:
+    """Headless game state and tick rules.
+
+    Holds the snakes, foods, obstacles and powerups and advances them one
+    tick per ``step()``. Nothing here touches pygame; renderers and audio
+    subscribe to the events emitted during a tick (see ``subscribe``).
+    """
+
+    def __init__(self, snake_colors, width=GRID_WIDTH, height=GRID_HEIGHT,
+                 food_count=FOOD_COUNT, max_obstacles=MAX_OBSTACLES, max_powerups=MAX_POWERUPS,
+                 obstacle_chance=OBSTACLE_SPAWN_CHANCE, powerup_chance=POWERUP_SPAWN_CHANCE,
+                 batched_ai=False, lookahead_ai=False, seed=None):
+        self.width = width
+        self.height = height
+        self.food_count = food_count
+        self.max_obstacles = max_obstacles
+        self.max_powerups = max_powerups
+        self.obstacle_chance = obstacle_chance
+        self.powerup_chance = powerup_chance
+        # Batched AI scores all snakes at once against the tick-start state;
+        # otherwise each snake decides after the snakes before it have moved.
+        self.batched_ai = batched_ai
+        if batched_ai and lookahead_ai:
+            raise ValueError("batched_ai and lookahead_ai are mutually exclusive")
+        self.planned = None
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.tick = 0
+        self.moves = []
+        self.listeners = []
+        # Set to a profiler.Profiler to time the phases of each tick.
+        self.profiler = NULL_PROFILER
+        self.grid = OccupancyGrid(width, height)
+
+        # Items keyed by position, in spawn order (foods map to None: an
+        # ordered set), so pickups and expiries never scan for their entry.
+        self.foods = {}
+        self.obstacles = {}
+        self.powerups = {}
+        self.obstacle_expiry = ExpiryQueue()
+        self.powerup_expiry = ExpiryQueue()
+        self.snakes = []
+        for color in snake_colors:
+            # Place them at random positions in the upper-left quadrant.
+            pos = (self.rng.randint(0, width//3), self.rng.randint(0, height//3))
+            direction = self.rng.choice(DIRECTIONS)
+            self.snakes.append(Snake(color, pos, direction))
+            self.grid.add_snake(pos)
+        self.turn_order = {snake: i for i, snake in enumerate(self.snakes)}
+        self.turn = -1                 # Index of the snake moving in step()
+        self.refill_food()
+        # The lookahead AI follows item events from here on; assign a
+        # LookaheadAI(self, ...) instead to change its depth or time budget.
+        self.lookahead = LookaheadAI(self) if lookahead_ai else None
+
+    # --- Events ---
+    def subscribe(self, listener):
+        # listener(event, snake, pos, detail) with event one of
+        #   "eat", "cut"            detail None
+        #   "spawn"                 snake respawned, detail is its direction
+        #   "powerup"               detail is the powerup type
+        #   "death"                 detail is one of DEATH_CAUSES
+        #   "kill"                  snake is the attacker, detail the victim
+        #   "spawn_food"            snake None, detail None
+        #   "spawn_obstacle"        snake None, detail is the timer
+        #   "spawn_powerup"         snake None, detail is (timer, type)
+        #   "expire_obstacle"       snake None, detail None
+        #   "expire_powerup"        snake None, detail None
+        self.listeners.append(listener)
+
+    def emit(self, event, snake, pos, detail=None):
+        for listener in self.listeners:
+            listener(event, snake, pos, detail)
+
+    # --- Queries ---
+    def in_bounds(self, pos):
+        return 0 <= pos[0] < self.width and 0 <= pos[1] < self.height
+
+    def random_free_cell(self):
+        return self.grid.random_free_cell(self.rng)
+
+    def is_obstacle(self, pos):
+        return self.grid.item_at(pos) == OBSTACLE
+
+    # --- State ---
+    SNAKE_FIELDS = ('direction', 'score', 'alive', 'respawn_flash_timer',
+                    'aggressive_timer', 'shield_timer', 'multiplier_timer')
+
+    # Between ticks, a timer that runs out on tick t has t - self.tick + 1
+    # countdown steps left (the one in tick t included).
+    def timer_left(self, expires):
+        return expires - self.tick + 1
+
+    def expiry_tick(self, timer):
+        return self.tick + timer - 1
+
+    def get_state(self):
+        # Plain-data copy of everything that evolves during play.
+        snakes = []
+        for snake in self.snakes:
+            data = {field: getattr(snake, field) for field in self.SNAKE_FIELDS}
+            data['respawn_timer'] = 0 if snake.alive else self.timer_left(snake.respawn_tick)
+            data['segments'] = list(snake.segments)
+            snakes.append(data)
+        return {
+            'tick': self.tick,
+            'rng': self.rng.getstate(),
+            'snakes': snakes,
+            'foods': list(self.foods),
+            'obstacles': [(obs['pos'], self.timer_left(obs['expires']))
+                          for obs in self.obstacles.values()],
+            'powerups': [(pu['pos'], self.timer_left(pu['expires']), pu['type'])
+                         for pu in self.powerups.values()],
+        }
+
+    def load_state(self, state):
+        if len(state['snakes']) != len(self.snakes):
+            raise ValueError(f"state has {len(state['snakes'])} snakes, world has {len(self.snakes)}")
+        self.tick = state['tick']
+        self.rng.setstate(state['rng'])
+        self.grid = OccupancyGrid(self.width, self.height)
+        for snake, data in zip(self.snakes, state['snakes']):
+            for field in self.SNAKE_FIELDS:
+                setattr(snake, field, data[field])
+            snake.respawn_tick = self.expiry_tick(data['respawn_timer'])
+            snake.segments = Segments.from_cells(data['segments'])
+            for seg in snake.segments:
+                self.grid.add_snake(seg)
+        self.foods = dict.fromkeys(state['foods'])
+        for pos in self.foods:
+            self.grid.set_item(pos, FOOD)
+        self.obstacles = {pos: {'pos': pos, 'expires': self.expiry_tick(timer)}
+                          for pos, timer in state['obstacles']}
+        self.obstacle_expiry = ExpiryQueue()
+        for obs in self.obstacles.values():
+            self.grid.set_item(obs['pos'], OBSTACLE)
+            self.obstacle_expiry.push(obs)
+        self.powerups = {pos: {'pos': pos, 'expires': self.expiry_tick(timer), 'type': pu_type}
+                         for pos, timer, pu_type in state['powerups']}
+        self.powerup_expiry = ExpiryQueue()
+        for pu in self.powerups.values():
+            self.grid.set_item(pu['pos'], POWERUP)
+            self.powerup_expiry.push(pu)
+        if self.lookahead is not None:
+            self.lookahead.rebuild()
+
+    # --- Snapshots ---
+    # get_state/load_state above are for storage; these copy live objects
+    # and arrays directly and keep the free-cell order, so a fork or a
+    # restored world plays on exactly like the original would. With a
+    # lookahead AI that holds only if it has no time budget (budget_us=None):
+    # a timed search can stop at a different point in each run.
+    def fork(self):
+        # Independent copy for what-if simulation. Listeners and the
+        # profiler are not carried over; a lookahead AI is, following the
+        # fork's own events.
+        world = World.__new__(type(self))
+        world.__dict__.update(self.__dict__)
+        world.listeners = []
+        world.profiler = NULL_PROFILER
+        world.rng = random.Random.__new__(random.Random)   # seeded by copy_state
+        world.grid = self.grid.copy()
+        world.snakes = [snake.copy() for snake in self.snakes]
+        world.turn_order = {snake: i for i, snake in enumerate(world.snakes)}
+        world.copy_state(self)
+        if self.lookahead is not None:
+            world.lookahead = self.lookahead.fork(world)
+        return world
+
+    def snapshot(self):
+        # A frozen fork; hand it to restore() any number of times.
+        return self.fork()
+
+    def restore(self, snapshot):
+        # Back to the snapshot's state in place: snake objects, listeners
+        # and the profiler stay. Listeners holding derived state (renderer
+        # caches) must be invalidated by the caller.
+        for snake, saved in zip(self.snakes, snapshot.snakes):
+            snake.__dict__.update(saved.__dict__)
+            snake.segments = saved.segments.copy()
+        self.grid.copy_from(snapshot.grid)
+        self.copy_state(snapshot)
+        if self.lookahead is not None:
+            self.lookahead.copy_from(snapshot.lookahead)
+
+    def copy_state(self, other):
+        # Everything but the snakes and the grid.
+        self.tick = other.tick
+        self.moves = list(other.moves)
+        self.rng.setstate(other.rng.getstate())
+        self.foods = other.foods.copy()
+        entries = {}
+        self.obstacles = {pos: entries.setdefault(id(obs), obs.copy())
+                          for pos, obs in other.obstacles.items()}
+        self.powerups = {pos: entries.setdefault(id(pu), pu.copy())
+                         for pos, pu in other.powerups.items()}
+        self.obstacle_expiry = other.obstacle_expiry.copy(entries)
+        self.powerup_expiry = other.powerup_expiry.copy(entries)
+
+    # --- Spawning ---
+    # roll_* make the random decisions (None when nothing spawns) and place_*
+    # apply them, so a replay can substitute recorded decisions.
+    def roll_food(self):
+        return self.random_free_cell()
+
+    def roll_obstacle(self):
+        if self.rng.random() >= self.obstacle_chance:
+            return None
+        pos = self.random_free_cell()
+        if pos is None:
+            return None
+        return pos, self.rng.randint(50, 150)
+
+    def roll_powerup(self):
+        if self.rng.random() >= self.powerup_chance:
+            return None
+        pos = self.random_free_cell()
+        if pos is None:
+            return None
+        timer = self.rng.randint(100, 200)
+        return pos, timer, self.rng.choice(POWERUP_TYPES)
+
+    def roll_respawn(self, snake):
+        pos = self.random_free_cell()
+        if pos is None:
+            pos = (self.rng.randint(0, self.width-1), self.rng.randint(0, self.height-1))
+        return pos, self.rng.choice(DIRECTIONS)
+
+    def place_food(self, pos):
+        self.foods[pos] = None
+        self.grid.set_item(pos, FOOD)
+        self.emit("spawn_food", None, pos)
+
+    # Items are placed during a tick and count down from the next one.
+    def place_obstacle(self, pos, timer):
+        obs = {'pos': pos, 'expires': self.tick + timer}
+        self.obstacles[pos] = obs
+        self.obstacle_expiry.push(obs)
+        self.grid.set_item(pos, OBSTACLE)
+        self.emit("spawn_obstacle", None, pos, timer)
+
+    def place_powerup(self, pos, timer, pu_type):
+        pu = {'pos': pos, 'expires': self.tick + timer, 'type': pu_type}
+        self.powerups[pos] = pu
+        self.powerup_expiry.push(pu)
+        self.grid.set_item(pos, POWERUP)
+        self.emit("spawn_powerup", None, pos, (timer, pu_type))
+
+    def refill_food(self):
+        # Maintain constant food count.
+        while len(self.foods) < self.food_count:
+            new_food = self.roll_food()
+            if new_food is None:
+                break
+            self.place_food(new_food)
+
+    def respawn_snake(self, snake):
+        pos, direction = self.roll_respawn(snake)
+        for seg in snake.segments.reset(pos):
+            self.grid.remove_snake(seg)
+        self.grid.add_snake(pos)
+        snake.direction = direction
+        snake.alive = True
+        snake.respawn_flash_timer = RESPAWN_FLASH_TICKS
+        self.emit("spawn", snake, pos, direction)
+
+    # --- Timed Items ---
+    def update_obstacles(self):
+        for obs in self.obstacle_expiry.pop_due(self.tick):
+            del self.obstacles[obs['pos']]
+            self.grid.clear_item(obs['pos'])
+            self.emit("expire_obstacle", None, obs['pos'])
+        if len(self.obstacles) < self.max_obstacles:
+            spawn = self.roll_obstacle()
+            if spawn is not None:
+                self.place_obstacle(*spawn)
+
+    def update_powerups(self):
+        for pu in self.powerup_expiry.pop_due(self.tick):
+            del self.powerups[pu['pos']]
+            self.grid.clear_item(pu['pos'])
+            self.emit("expire_powerup", None, pu['pos'])
+        if len(self.powerups) < self.max_powerups:
+            spawn = self.roll_powerup()
+            if spawn is not None:
+                self.place_powerup(*spawn)
+
+    # --- Tick ---
+    def kill(self, snake, cause):
+        snake.alive = False
+        # Dead snakes count down on their own turns, starting with this
+        # tick's if it is still to come.
+        first = self.tick if self.turn_order[snake] > self.turn else self.tick + 1
+        snake.respawn_tick = first + RESPAWN_TICKS - 1
+        self.emit("death", snake, snake.head(), cause)
+
+    def choose_direction(self, i, snake):
+        if self.planned is not None:
+            return self.planned[i]
+        if self.lookahead is not None:
+            return self.lookahead.choose(snake)
+        return get_direction_for_snake(self, snake)
+
+    def step(self):
+        prof = self.profiler
+        t = prof.begin()
+        self.update_obstacles()
+        t = prof.end("update_obstacles", t)
+        self.update_powerups()
+        t = prof.end("update_powerups", t)
+        self.refill_food()
+        t = prof.end("refill_food", t)
+        if self.batched_ai:
+            _, self.planned = plan_moves(self)
+            t = prof.end("ai", t)
+        # moves[i] is the direction snake i chose this tick, None if it was
+        # trapped, or NOT_MOVED if it was dead.
+        self.moves = [NOT_MOVED] * len(self.snakes)
+        for i, snake in enumerate(self.snakes):
+            self.turn = i
+            if snake.alive:
+                self.moves[i] = dir_choice = self.choose_direction(i, snake)
+                t = prof.end("ai", t)
+                self.move_snake(snake, dir_choice)
+                t = prof.end("collision", t)
+            elif self.tick >= snake.respawn_tick:
+                self.respawn_snake(snake)
+                t = prof.end("respawn", t)
+        self.turn = -1
+        self.planned = None
+        self.tick += 1
+        prof.count_tick()
+
+    def move_snake(self, snake, dir_choice):
+        if dir_choice is None:
+            self.kill(snake, "trapped")
+            return
+        snake.direction = dir_choice
+        new_head = (snake.head()[0] + dir_choice[0], snake.head()[1] + dir_choice[1])
+        if not self.in_bounds(new_head):
+            self.kill(snake, "wall")
+            return
+        if self.is_obstacle(new_head):
+            self.kill(snake, "obstacle")
+            return
+
+        # Check enemy collisions. A head can only be met on a cell some
+        # segment already covers, so skip the scan on empty cells.
+        others = self.snakes if self.grid.snake_count[new_head] else ()
+        for other in others:
+            if other == snake:
+                continue
+            if new_head == other.head():
+                if snake.aggressive_timer > 0 or len(snake.segments) > len(other.segments):
+                    if other.shield_timer > 0:
+                        other.shield_timer = 0
+                    else:
+                        self.kill(other, "attacked")
+                        self.emit("kill", snake, new_head, other)
+                    snake.score += 2
+                else:
+                    if snake.shield_timer > 0:
+                        snake.shield_timer = 0
+                    else:
+                        self.kill(snake, "head_on")
+                    break
+        if not snake.alive:
+            return
+
+        snake.segments.push_head(new_head)
+        self.grid.add_snake(new_head)
+        # Check if snake eats food.
+        if self.grid.item_at(new_head) == FOOD:
+            if snake.multiplier_timer > 0:
+                snake.score += 2
+            else:
+                snake.score += 1
+            self.emit("eat", snake, new_head)
+            del self.foods[new_head]
+            self.grid.clear_item(new_head)
+        else:
+            self.grid.remove_snake(snake.segments.pop_tail())
+
+        # Self-collision: cut tail.
+        if snake.segments.count(new_head) > 1:
+            for seg in snake.segments.cut_at(new_head):
+                self.grid.remove_snake(seg)
+            self.emit("cut", snake, new_head)
+
+        # Check for powerup pickup.
+        if self.grid.item_at(new_head) == POWERUP:
+            pu = self.powerups.pop(new_head)
+            if pu['type'] == "aggressive":
+                snake.aggressive_timer = POWERUP_TICKS
+            elif pu['type'] == "shield":
+                snake.shield_timer = POWERUP_TICKS
+            elif pu['type'] == "multiplier":
+                snake.multiplier_timer = POWERUP_TICKS
+            self.emit("powerup", snake, new_head, pu['type'])
+            pu['expires'] = None
+            self.grid.clear_item(new_head)
+
+        # Decrement timers.
+        if snake.aggressive_timer > 0:
+            snake.aggressive_timer -= 1
+        if snake.shield_timer > 0:
+            snake.shield_timer -= 1
+        if snake.multiplier_timer > 0:
+            snake.multiplier_timer -= 1
+        if snake.respawn_flash_timer > 0:
+            snake.respawn_flash_timer -= 1
+
+
+# --- Construction ---
+def snake_colors(n_snakes):
+    # The DEFAULT_SNAKES colors, repeated when there are more snakes.
+    return [DEFAULT_SNAKES[i % len(DEFAULT_SNAKES)][1] for i in range(n_snakes)]
+
+
+def scaled_world(n_snakes, width=GRID_WIDTH, height=GRID_HEIGHT, **options):
+    # Food and item caps grow with the snake count, keeping the standard
+    # six-snake board's amounts per snake. Other options go to World.
+    scale = max(1, n_snakes // len(DEFAULT_SNAKES))
+    return World(snake_colors(n_snakes), width=width, height=height, food_count=FOOD_COUNT * scale,
+                 max_obstacles=MAX_OBSTACLES * scale, max_powerups=MAX_POWERUPS * scale, **options)